@@ -2,6 +2,15 @@ import streamlit as st
 
 import streamlit as st
 
+
+def start_warm_up():
+    # utils.warmup pulls in the whole data and chart stack, so it is only
+    # imported once the welcome text is on screen.
+    from utils.warmup import start_warm_up
+
+    start_warm_up()
+
+
 st.set_page_config(page_title="Spotify Exploration", layout="centered")
 
 st.title("Spotify Analysis")
@@ -26,3 +35,7 @@ st.write("")
 st.write(
     "Hope you find this information as interesting as I did! If you would like to get a glimpse on how I have generated some of the graphs, you can visit a notebook I have created in Kaggle here: https://www.kaggle.com/code/aldggr/some-fun-visualisations, where you can leave any comments and any feedback is more than welcome."
 )
+
+# Most visitors land here first, so the caches start filling in the
+# background while they read.
+start_warm_up()
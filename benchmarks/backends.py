@@ -0,0 +1,84 @@
+"""Compare the engines that compute the Overall page's tables.
+
+Usage (from the repository root):
+
+    python -m benchmarks.backends
+    python -m benchmarks.backends --repeat 10 --output backends.json
+
+Every installed engine of ``utils.backend`` is timed against the original
+eager pandas version (``read_all`` and ``overall_tables``), and its tables are
+checked against it. DuckDB's one-time import of the partitions is timed
+separately, since the server does it once per data version at startup.
+"""
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from utils import backend, sql
+from utils.chunked import compare, overall_tables
+from utils.data import read_all
+
+
+def eager_tables():
+    return overall_tables(read_all())
+
+
+def timed(func, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    engines = {"pandas (eager)": eager_tables}
+    engines.update({name: backend.ENGINES[name] for name in backend.available()})
+
+    if sql.HAS_DUCKDB:
+        start = time.perf_counter()
+        sql.connection()
+        print(f"duckdb import: {time.perf_counter() - start:.2f}s (once per version)")
+
+    report = {}
+    expected = None
+    for name, func in engines.items():
+        seconds, tables = timed(func, args.repeat)
+        if expected is None:
+            expected, same = tables, True
+        else:
+            # Engines may pick other integer or float types for the same
+            # values, e.g. DuckDB sums integers into floats.
+            same = all(
+                [
+                    compare(
+                        f"{name} {table}", expected[table], tables[table], False, False
+                    )
+                    for table in expected
+                ]
+            )
+        report[name] = {"seconds": seconds, "same": same}
+
+    base = report["pandas (eager)"]["seconds"]
+    print(f"\n{'engine':>15}  {'median':>8}  {'speed-up':>8}  same")
+    for name, result in report.items():
+        print(
+            f"{name:>15}  {result['seconds']:>7.3f}s"
+            f"  {base / result['seconds']:>7.1f}x  {result['same']}"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
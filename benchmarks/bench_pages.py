@@ -0,0 +1,270 @@
+"""Run every page headless through AppTest and write a JSON timing report.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_pages --output bench_report.json
+    python -m benchmarks.bench_pages --baseline old_report.json
+
+Each page runs in its own process so the first run is a true cold start and
+the peak RSS belongs to that page only. The on-disk cache store is switched
+off for the same reason; ``benchmarks.cold_start`` measures it separately.
+Parts of a page built by ``utils.jobs`` are waited for and timed on their
+own, then the page is rerun to show them.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+ARTIST_SELECTBOX = "Select artist:"
+FAST_MODE_KEY = "fast_mode"
+
+
+def list_pages():
+    return ["Welcome.py"] + sorted(
+        str(p.relative_to(ROOT)) for p in (ROOT / "pages").glob("*.py")
+    )
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def count_elements(node):
+    children = getattr(node, "children", None)
+    if children is None:
+        return 1
+    return sum(count_elements(child) for child in children.values())
+
+
+def chart_payloads(at):
+    # The spec is the exact JSON string shipped to the browser for each chart.
+    return [len(chart.proto.spec.encode()) for chart in at.get("plotly_chart")]
+
+
+def section_timings(at):
+    from utils.timing import TIMINGS_KEY
+
+    try:
+        run = at.session_state[TIMINGS_KEY]
+    except KeyError:
+        return {}
+    return {record["section"]: record["wall_s"] for record in run["sections"]}
+
+
+def run_milestones(at):
+    # Seconds into the run when the first chart was sent and when everything
+    # but the deferred sections was on screen.
+    from utils.timing import TIMINGS_KEY
+
+    try:
+        run = at.session_state[TIMINGS_KEY]
+    except KeyError:
+        return {}
+    return {key: run[key] for key in ("first_chart_s", "main_s") if key in run}
+
+
+def timed_run(at, timeout):
+    start = time.perf_counter()
+    at.run(timeout=timeout)
+    return time.perf_counter() - start
+
+
+def drain_jobs(timeout):
+    # A run returns while background jobs still build parts of the page;
+    # wait for them and return the seconds from the first one being queued
+    # to the last one finishing, or None when nothing was queued.
+    from utils import jobs
+
+    waiting = jobs.pending()
+    for job in waiting:
+        jobs.wait(job, timeout)
+    if not waiting:
+        return None
+    end = max(job.get("finished", time.time()) for job in waiting)
+    return end - min(job["queued"] for job in waiting)
+
+
+def run_error(at):
+    if at.exception:
+        return at.exception[0].message
+    return None
+
+
+def bench_page(page, repeat=3, timeout=120):
+    # Measure the page on its own, without the background cache warm-up or
+    # figures left in the disk store by earlier runs.
+    os.environ.setdefault("APP_WARM_UP", "0")
+    os.environ.setdefault("APP_CACHE_STORE", "0")
+    os.chdir(ROOT)
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+    from streamlit.testing.v1 import AppTest
+
+    from utils.timing import (
+        CHART_BUDGET_ENV,
+        CHART_BUDGET_KB,
+        PAGE_BUDGET_ENV,
+        PAGE_BUDGET_KB,
+        budget_kb,
+    )
+
+    result = {"page": page, "baseline_rss_mb": round(peak_rss_mb(), 1)}
+
+    at = AppTest.from_file(str(ROOT / page), default_timeout=timeout)
+    result["cold_s"] = timed_run(at, timeout)
+    result["error"] = run_error(at)
+    result["sections_s"] = section_timings(at)
+    result.update({f"cold_{k}": v for k, v in run_milestones(at).items()})
+
+    jobs_s = drain_jobs(timeout)
+    if jobs_s is not None and result["error"] is None:
+        # The rerun that replaces the progress bars with the finished parts.
+        result["cold_jobs_s"] = jobs_s
+        result["cold_ready_s"] = timed_run(at, timeout)
+        result["error"] = run_error(at)
+    result["elements"] = count_elements(at._tree)
+
+    charts = chart_payloads(at)
+    chart_budget = budget_kb(CHART_BUDGET_ENV, CHART_BUDGET_KB) * 1024
+    result["chart_bytes"] = charts
+    result["payload_bytes"] = sum(charts)
+    result["charts_over_budget"] = sum(size > chart_budget for size in charts)
+    result["page_over_budget"] = (
+        result["payload_bytes"] > budget_kb(PAGE_BUDGET_ENV, PAGE_BUDGET_KB) * 1024
+    )
+
+    if result["error"] is None:
+        warm = [timed_run(at, timeout) for _ in range(repeat)]
+        result["warm_s"] = statistics.median(warm)
+        result["warm_min_s"] = min(warm)
+
+        selectors = [s for s in at.selectbox if s.label == ARTIST_SELECTBOX]
+        if selectors and len(selectors[0].options) > 1:
+            options = selectors[0].options
+            artist = []
+            for n in range(repeat):
+                selectors[0].set_value(options[(n + 1) % len(options)])
+                artist.append(timed_run(at, timeout))
+                selectors = [s for s in at.selectbox if s.label == ARTIST_SELECTBOX]
+            result["artist_rerun_s"] = statistics.median(artist)
+
+        toggles = [t for t in at.toggle if t.key == FAST_MODE_KEY]
+        if toggles and toggles[0].value:
+            # The exact charts are built by a background job: time the run
+            # that queues it, the job, and the rerun that shows its result.
+            toggles[0].set_value(False)
+            result["exact_s"] = timed_run(at, timeout)
+            jobs_s = drain_jobs(timeout)
+            if jobs_s is not None:
+                result["exact_jobs_s"] = jobs_s
+                result["exact_ready_s"] = timed_run(at, timeout)
+            result["error"] = run_error(at)
+
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return result
+
+
+def run_isolated(page, repeat, timeout):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(bench_page, page, repeat, timeout).result()
+
+
+def compare(report, baseline):
+    old_pages = baseline.get("pages", {})
+    for page, new in report["pages"].items():
+        old = old_pages.get(page)
+        if old is None:
+            continue
+        parts = []
+        for key in (
+            "cold_s",
+            "cold_first_chart_s",
+            "cold_main_s",
+            "cold_jobs_s",
+            "warm_s",
+            "exact_jobs_s",
+            "artist_rerun_s",
+            "peak_rss_mb",
+            "payload_bytes",
+        ):
+            if key in new and key in old and old[key]:
+                parts.append(f"{key} {new[key] / old[key]:.2f}x")
+        print(f"{page}: " + ", ".join(parts))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="bench_report.json")
+    parser.add_argument("--baseline", help="previous report to compare against")
+    parser.add_argument("--pages", nargs="*", help="subset of pages to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args(argv)
+
+    import streamlit
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "streamlit": streamlit.__version__,
+        "cpu_count": os.cpu_count(),
+        "pages": {},
+    }
+
+    for page in args.pages or list_pages():
+        result = run_isolated(page, args.repeat, args.timeout)
+        report["pages"][page] = result
+        print(
+            f"{page}: cold {result['cold_s']:.2f}s"
+            + (
+                f" (first chart {result['cold_first_chart_s']:.2f}s)"
+                if "cold_first_chart_s" in result
+                else ""
+            )
+            + (
+                f", background jobs {result['cold_jobs_s']:.2f}s"
+                if "cold_jobs_s" in result
+                else ""
+            )
+            + (f", warm {result['warm_s']:.2f}s" if "warm_s" in result else "")
+            + (
+                f", artist {result['artist_rerun_s']:.2f}s"
+                if "artist_rerun_s" in result
+                else ""
+            )
+            + (
+                f", exact charts {result['exact_s']:.2f}s"
+                f" ({result['exact_jobs_s']:.2f}s in the background)"
+                if "exact_jobs_s" in result
+                else ""
+            )
+            + f", {result['elements']} elements, peak {result['peak_rss_mb']} MB"
+            + f", {result['payload_bytes'] / 1024:.0f} KB of charts"
+            + (" (over budget)" if result["page_over_budget"] else "")
+            + (f" [error: {result['error']}]" if result["error"] else "")
+        )
+
+    Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True))
+
+    if args.baseline:
+        compare(report, json.loads(Path(args.baseline).read_text()))
+
+
+if __name__ == "__main__":
+    main()
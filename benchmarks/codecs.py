@@ -0,0 +1,116 @@
+"""Compare the partition formats: size on disk, cold and warm load time.
+
+Usage (from the repository root):
+
+    python -m benchmarks.codecs
+    python -m benchmarks.codecs --repeat 10 --output codecs.json
+
+Every decade is written once per format into a temporary directory: the
+plain CSV files, and Parquet with each codec ``APP_PARTITION_CODEC`` accepts.
+A cold load reads all of them in a fresh process, so it includes importing
+the Parquet reader; a warm load repeats the read in the same process. The
+files are in the OS page cache either way, so on a slow disk the smaller
+files gain more than shown here.
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+from benchmarks.bench_pages import ROOT
+
+FORMATS = ["csv", "none", "snappy", "lz4", "zstd"]
+
+
+def setup_process():
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+
+def read_files(paths, fmt):
+    import pandas as pd
+
+    if fmt == "csv":
+        return [pd.read_csv(path) for path in paths]
+    return [pd.read_parquet(path) for path in paths]
+
+
+def write_files(directory, fmt):
+    from utils.data import DECADES, partition_path, write_parquet
+
+    paths = []
+    for decade in DECADES:
+        if fmt == "csv":
+            path = directory / partition_path(decade).name
+            shutil.copyfile(partition_path(decade), path)
+        else:
+            path = directory / fmt / f"data_{decade}-bench.parquet"
+            write_parquet(read_files([partition_path(decade)], "csv")[0], path, fmt)
+        paths.append(path)
+    return paths
+
+
+def cold_load(paths, fmt):
+    setup_process()
+    # Import pandas first, the server has it loaded long before.
+    read_files([], "csv")
+    start = time.perf_counter()
+    read_files(paths, fmt)
+    return time.perf_counter() - start
+
+
+def isolated(func, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(func, *args).result()
+
+
+def measure(directory, fmt, repeat):
+    paths = write_files(directory, fmt)
+    cold = [isolated(cold_load, paths, fmt) for _ in range(repeat)]
+    warm = []
+    read_files(paths, fmt)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        read_files(paths, fmt)
+        warm.append(time.perf_counter() - start)
+    return {
+        "size_mb": sum(path.stat().st_size for path in paths) / 1e6,
+        "cold_s": statistics.median(cold),
+        "warm_s": statistics.median(warm),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--formats", nargs="*", default=FORMATS, choices=FORMATS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    setup_process()
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for fmt in args.formats:
+            report[fmt] = measure(Path(directory), fmt, args.repeat)
+
+    print(f"{'format':>9}  {'size':>9}  {'cold':>7}  {'warm':>7}")
+    for fmt, result in report.items():
+        name = fmt if fmt == "csv" else f"pq {fmt}"
+        print(
+            f"{name:>9}  {result['size_mb']:>6.2f} MB"
+            f"  {result['cold_s']:>6.3f}s  {result['warm_s']:>6.3f}s"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Compare a server cold start with and without the on-disk cache store.
+
+Usage (from the repository root):
+
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --pages pages/3_1950s.py --repeat 5
+
+Every measurement runs in a fresh process, like a restarted server: first the
+full startup warm-up, then the first run of each page without warm-up. The
+store lives in a temporary directory, so the real one is left alone.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+from benchmarks.bench_pages import ROOT, peak_rss_mb, run_error
+
+DEFAULT_PAGES = [
+    "pages/2_Overall Data.py",
+    "pages/3_1950s.py",
+    "pages/9_Decade Comparison.py",
+]
+
+
+def setup_process(env):
+    os.environ.update(env)
+    os.chdir(ROOT)
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+
+def time_warm_up(env):
+    setup_process(env)
+    from utils.warmup import progress, warm_up
+
+    start = time.perf_counter()
+    warm_up()
+    return {
+        "seconds": time.perf_counter() - start,
+        "failed": progress["failed"],
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def time_first_run(env, page, timeout):
+    setup_process({**env, "APP_WARM_UP": "0"})
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / page), default_timeout=timeout)
+    start = time.perf_counter()
+    at.run(timeout=timeout)
+    return {"seconds": time.perf_counter() - start, "error": run_error(at)}
+
+
+def isolated(func, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(func, *args).result()
+
+
+def measure(env, pages, repeat, timeout):
+    warm_up = [isolated(time_warm_up, env) for _ in range(repeat)]
+    result = {
+        "warm_up_s": statistics.median(run["seconds"] for run in warm_up),
+        "warm_up_failed": warm_up[-1]["failed"],
+        "peak_rss_mb": warm_up[-1]["peak_rss_mb"],
+        "first_run_s": {},
+    }
+    for page in pages:
+        runs = [isolated(time_first_run, env, page, timeout) for _ in range(repeat)]
+        result["first_run_s"][page] = statistics.median(run["seconds"] for run in runs)
+        if runs[-1]["error"]:
+            result.setdefault("errors", {})[page] = runs[-1]["error"]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="*", default=DEFAULT_PAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as store:
+        memory = {"APP_CACHE_STORE": "0"}
+        disk = {"APP_CACHE_STORE": "1", "APP_CACHE_DIR": store}
+        # One throwaway run fills the store, as the previous server would have.
+        isolated(time_warm_up, disk)
+        report = {
+            "without_store": measure(memory, args.pages, args.repeat, args.timeout),
+            "with_store": measure(disk, args.pages, args.repeat, args.timeout),
+        }
+
+    without, with_ = report["without_store"], report["with_store"]
+    print(
+        f"warm-up: {without['warm_up_s']:.2f}s without store,"
+        f" {with_['warm_up_s']:.2f}s with store"
+    )
+    for page in args.pages:
+        print(
+            f"{page} first run: {without['first_run_s'][page]:.2f}s without store,"
+            f" {with_['first_run_s'][page]:.2f}s with store"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Time building a decade page's figures serially, on threads and on processes.
+
+Usage (from the repository root):
+
+    python -m benchmarks.figures
+    python -m benchmarks.figures --workers 2 4 8 --repeat 5
+
+For every page decade the summary figures and the ten distribution figures
+are built from data that is already loaded, so only the figure construction
+is timed. The pools are started before the clock, like a pool a server
+would keep; for processes the time includes sending the frames to the
+workers and the figures back. Building a plotly figure is mostly Python code
+holding the GIL, so threads are not expected to scale. On more than one CPU
+the background job building the exact distribution figures uses processes
+(``utils.jobs.process_pool``); a single CPU builds them serially.
+"""
+
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+from benchmarks.codecs import setup_process
+from utils.aggregates import decade_means, load_cis
+from utils.data import DECADE_COLS, PAGE_DECADES, load_decade
+from utils.figures import (
+    explicit_count_figure,
+    fun_subplots_plotly,
+    key_count_figure,
+    key_counts,
+    mean_values_figure,
+    prepare_decade,
+)
+from utils.jobs import available_cpus
+
+
+def figure_tasks(decade):
+    """``(function, args)`` per figure of the page, all data already in memory.
+
+    Both are picklable, so the same tasks can be sent to a process pool.
+    """
+    df = load_decade(decade)
+    prepared = prepare_decade(df)
+    tasks = [
+        (mean_values_figure, (decade_means(prepared, load_cis(), decade),)),
+        (explicit_count_figure, (prepared["explicit"].value_counts().to_frame(),)),
+        (key_count_figure, (key_counts(prepared["key_mode"]).to_frame(),)),
+    ]
+    tasks += [(fun_subplots_plotly, (df, col)) for col in DECADE_COLS]
+    return tasks
+
+
+def run_task(task):
+    func, args = task
+    return func(*args)
+
+
+def time_runs(build, tasks, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page_tasks in tasks:
+            build(page_tasks)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", nargs="*", type=int, default=[2, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    setup_process()
+    tasks = [figure_tasks(decade) for decade in PAGE_DECADES]
+    report = {"cpus": available_cpus(), "seconds": {}}
+    report["seconds"]["serial"] = time_runs(
+        lambda page_tasks: [run_task(task) for task in page_tasks], tasks, args.repeat
+    )
+    for workers in args.workers:
+        with ThreadPoolExecutor(workers) as pool:
+            report["seconds"][f"{workers} threads"] = time_runs(
+                lambda page_tasks: list(pool.map(run_task, page_tasks)),
+                tasks,
+                args.repeat,
+            )
+        with ProcessPoolExecutor(
+            workers, mp_context=get_context("spawn"), initializer=setup_process
+        ) as pool:
+            # Start the workers and import the figure code before timing.
+            list(pool.map(run_task, tasks[0][:workers]))
+            report["seconds"][f"{workers} processes"] = time_runs(
+                lambda page_tasks: list(pool.map(run_task, page_tasks)),
+                tasks,
+                args.repeat,
+            )
+
+    serial = report["seconds"]["serial"]
+    print(f"{report['cpus']} CPUs available, {len(tasks)} pages of figures")
+    for mode, seconds in report["seconds"].items():
+        print(f"{mode:>12}: {seconds:.3f}s  {serial / seconds:.2f}x")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
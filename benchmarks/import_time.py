@@ -0,0 +1,108 @@
+"""Report how much import time each page adds on top of streamlit itself.
+
+Usage (from the repository root):
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --top 15 --output imports.json
+
+The top-level imports of every page are run in a fresh interpreter under
+``python -X importtime`` and the output is parsed. Imports done inside
+functions (deferred to the section that needs them) are not counted, which
+is the point: they do not slow down the first render.
+"""
+
+import argparse
+import ast
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.bench_pages import ROOT, list_pages
+
+BASELINE = "import streamlit"
+
+
+def page_imports(page):
+    tree = ast.parse((ROOT / page).read_text())
+    return [
+        ast.unparse(node)
+        for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+
+
+def parse_importtime(stderr):
+    """Return {module: (self_us, cumulative_us, depth)} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def importtime(code):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.splitlines()[-1])
+    return parse_importtime(proc.stderr)
+
+
+def total_us(modules):
+    # Only the outermost imports, their cumulative time already covers the rest.
+    return sum(cum for _, cum, depth in modules.values() if depth == 0)
+
+
+def page_report(page, baseline, top):
+    imports = page_imports(page)
+    modules = importtime("\n".join([BASELINE] + imports))
+    extra = {name: t for name, t in modules.items() if name not in baseline}
+    heaviest = sorted(extra.items(), key=lambda item: item[1][0], reverse=True)
+    return {
+        "imports": imports,
+        "total_ms": total_us(modules) / 1000,
+        "extra_ms": sum(self_us for self_us, _, _ in extra.values()) / 1000,
+        "extra_modules": len(extra),
+        "heaviest": [
+            {"module": name, "self_ms": s / 1000, "cumulative_ms": c / 1000}
+            for name, (s, c, _) in heaviest[:top]
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="*", help="subset of pages to inspect")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--output", help="write the report as JSON here")
+    args = parser.parse_args(argv)
+
+    baseline = importtime(BASELINE)
+    report = {"baseline_ms": total_us(baseline) / 1000, "pages": {}}
+    print(f"{BASELINE}: {report['baseline_ms']:.0f} ms")
+
+    for page in args.pages or list_pages():
+        result = page_report(page, baseline, args.top)
+        report["pages"][page] = result
+        heaviest = ", ".join(
+            f"{m['module']} {m['self_ms']:.0f}ms" for m in result["heaviest"]
+        )
+        print(
+            f"{page}: +{result['extra_ms']:.0f} ms over streamlit"
+            f" ({result['extra_modules']} modules) - {heaviest}"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Simulate many concurrent sessions hitting random pages through AppTest.
+
+Usage (from the repository root):
+
+    python -m benchmarks.load_test --sessions 1 4 8 16 --requests 20
+    python -m benchmarks.load_test --mode process --sessions 4 --output load.json
+
+Every simulated session opens random pages and, where the page has the artist
+selectbox, picks random artists. In thread mode all sessions share one
+process, like a single Streamlit server, so they share caches and the GIL.
+For each concurrency level the report has rerun latency percentiles,
+throughput, errors and process memory growth.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.bench_pages import ARTIST_SELECTBOX, ROOT, list_pages, peak_rss_mb
+from utils.diagnostics import current_rss_mb
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, interval=0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = [current_rss_mb()]
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.samples.append(current_rss_mb())
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.samples.append(current_rss_mb())
+
+
+def setup_process():
+    os.environ.setdefault("APP_WARM_UP", "0")
+    os.chdir(ROOT)
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+
+def run_session(session_id, pages, requests, artist_picks, seed, timeout):
+    """Play one user session and return a list of (kind, page, seconds, error)."""
+    setup_process()
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed + session_id)
+    records = []
+    while len(records) < requests:
+        page = rng.choice(pages)
+        at = AppTest.from_file(str(ROOT / page), default_timeout=timeout)
+        start = time.perf_counter()
+        try:
+            at.run(timeout=timeout)
+            error = at.exception[0].message if at.exception else None
+        except Exception as e:
+            error = repr(e)
+        records.append(("page", page, time.perf_counter() - start, error))
+        if error:
+            continue
+
+        selectors = [s for s in at.selectbox if s.label == ARTIST_SELECTBOX]
+        for _ in range(artist_picks if selectors else 0):
+            if len(records) >= requests:
+                break
+            selectors[0].set_value(rng.choice(selectors[0].options))
+            start = time.perf_counter()
+            try:
+                at.run(timeout=timeout)
+                error = at.exception[0].message if at.exception else None
+            except Exception as e:
+                error = repr(e)
+            records.append(("artist", page, time.perf_counter() - start, error))
+            selectors = [s for s in at.selectbox if s.label == ARTIST_SELECTBOX]
+            if error or not selectors:
+                break
+    return records
+
+
+def run_process_session(*args):
+    # Same as run_session but also reports the worker's own memory.
+    start_rss = current_rss_mb()
+    records = run_session(*args)
+    return records, start_rss, current_rss_mb(), peak_rss_mb()
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50_s": p50, "p95_s": p95, "p99_s": p99, "max_s": max(values)}
+
+
+def run_level(sessions, args, pages):
+    session_args = [
+        (n, pages, args.requests, args.artist_picks, args.seed, args.timeout)
+        for n in range(sessions)
+    ]
+    sampler = RssSampler()
+    sampler.start()
+    start = time.perf_counter()
+
+    if args.mode == "thread":
+        with ThreadPoolExecutor(max_workers=sessions) as pool:
+            results = list(pool.map(lambda a: run_session(*a), session_args))
+        worker_memory = None
+    else:
+        with ProcessPoolExecutor(
+            max_workers=sessions, mp_context=get_context("spawn")
+        ) as pool:
+            outputs = list(pool.map(run_process_session, *zip(*session_args)))
+        results = [records for records, *_ in outputs]
+        worker_memory = [
+            {"start_mb": s, "end_mb": e, "peak_mb": p} for _, s, e, p in outputs
+        ]
+
+    wall = time.perf_counter() - start
+    sampler.stop()
+
+    records = [record for session in results for record in session]
+    latencies = [seconds for _, _, seconds, error in records if error is None]
+    level = {
+        "sessions": sessions,
+        "mode": args.mode,
+        "runs": len(records),
+        "errors": sum(error is not None for *_, error in records),
+        "wall_s": wall,
+        "throughput_runs_per_s": len(records) / wall,
+        "latency": percentiles(latencies),
+        "page_latency": percentiles(
+            [s for kind, _, s, error in records if kind == "page" and error is None]
+        ),
+        "artist_latency": percentiles(
+            [s for kind, _, s, error in records if kind == "artist" and error is None]
+        ),
+        "rss_start_mb": sampler.samples[0],
+        "rss_peak_mb": max(sampler.samples),
+        "rss_end_mb": sampler.samples[-1],
+        "rss_growth_mb": sampler.samples[-1] - sampler.samples[0],
+    }
+    if worker_memory is not None:
+        level["worker_memory"] = worker_memory
+        level["worker_growth_mb"] = sum(
+            w["end_mb"] - w["start_mb"] for w in worker_memory
+        )
+    error_messages = sorted({error for *_, error in records if error})
+    if error_messages:
+        level["error_messages"] = error_messages[:10]
+    return level
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=10, help="runs per session")
+    parser.add_argument("--artist-picks", type=int, default=2)
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--pages", nargs="*", help="subset of pages to hit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument(
+        "--warm-up",
+        action="store_true",
+        help="fill the caches before the first level, like a warmed-up server",
+    )
+    parser.add_argument("--output", help="write the report as JSON here")
+    args = parser.parse_args(argv)
+
+    setup_process()
+    pages = args.pages or list_pages()
+
+    if args.warm_up:
+        from utils.warmup import warm_up
+
+        warm_up()
+
+    report = {
+        "cpu_count": os.cpu_count(),
+        "pages": pages,
+        "warm_up": args.warm_up,
+        "levels": [],
+    }
+    for sessions in args.sessions:
+        level = run_level(sessions, args, pages)
+        report["levels"].append(level)
+        latency = level["latency"]
+        print(
+            f"{sessions:>3} sessions: {level['runs']} runs"
+            f" ({level['errors']} errors) in {level['wall_s']:.1f}s,"
+            f" {level['throughput_runs_per_s']:.2f} runs/s,"
+            f" p50 {latency.get('p50_s', float('nan')):.2f}s"
+            f" p95 {latency.get('p95_s', float('nan')):.2f}s"
+            f" p99 {latency.get('p99_s', float('nan')):.2f}s,"
+            f" RSS {level['rss_start_mb']:.0f} -> {level['rss_end_mb']:.0f} MB"
+            f" (peak {level['rss_peak_mb']:.0f})"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+import time
+import warnings
+
+from streamlit.runtime.caching import get_data_cache_stats_provider
+
+from utils import jobs, store
+from utils.data import data_version
+from utils.diagnostics import (
+    cache_table,
+    current_rss_mb,
+    diagnostics_enabled,
+    peak_rss_mb,
+    rerun_table,
+)
+from utils.warmup import is_ready, progress
+
+warnings.filterwarnings("ignore")
+
+pio.templates.default = "plotly_dark"
+
+pd.set_option("display.precision", 2)
+
+st.set_page_config(page_title="Diagnostics", layout="wide")
+
+if not diagnostics_enabled():
+    st.info("Nothing to see here.")
+    st.stop()
+
+st.title("Diagnostics")
+st.write("")
+
+st.write(
+    "Everything below belongs to this server process, since it started. Reload the page to refresh the numbers."
+)
+
+col_1, col_2, col_3, col_4 = st.columns(4)
+col_1.metric("RSS", f"{current_rss_mb():.0f} MB")
+col_2.metric("Peak RSS", f"{peak_rss_mb():.0f} MB")
+if is_ready():
+    warm_up = "done"
+elif progress["total"]:
+    warm_up = f"{progress['done']}/{progress['total']}"
+else:
+    warm_up = "not started"
+col_3.metric("Warm-up", warm_up)
+col_4.metric("Data version", data_version()[:12])
+
+if progress["failed"]:
+    st.warning("Failed warm-up steps: " + ", ".join(progress["failed"]))
+
+st.header("Caches")
+
+st.write(
+    "A miss is a build of the cached value. Entries and sizes count the keys built so far, so a key that was evicted and never asked for again still shows up; evictions are keys that had to be built a second time. Sizes are the in-memory estimate of the data frames and chart arrays."
+)
+
+caches = cache_table()
+if caches.empty:
+    st.write("No cache has been used yet.")
+else:
+    st.dataframe(
+        caches,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "size_mb": st.column_config.NumberColumn("size (MB)", format="%.1f"),
+            "hit_rate": st.column_config.ProgressColumn(
+                "hit rate", format="percent", min_value=0, max_value=1
+            ),
+            "avg_lookup_ms": st.column_config.NumberColumn(
+                "avg lookup (ms)", format="%.1f"
+            ),
+            "avg_build_ms": st.column_config.NumberColumn(
+                "avg build (ms)", format="%.1f"
+            ),
+        },
+    )
+
+col_1, col_2 = st.columns(2)
+
+with col_1:
+    st.subheader("Streamlit data caches")
+    memory = get_data_cache_stats_provider().get_stats()
+    memory = pd.DataFrame(
+        [
+            {"function": stat.cache_name, "mb": stat.byte_length / 1024**2}
+            for stats in memory.values()
+            for stat in stats
+        ],
+        columns=["function", "mb"],
+    )
+    st.dataframe(
+        memory,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "mb": st.column_config.NumberColumn("pickled (MB)", format="%.2f")
+        },
+    )
+
+with col_2:
+    st.subheader("Disk store")
+    files, size = store.disk_usage()
+    st.write(
+        f"{'Enabled' if store.enabled() else 'Disabled'}, {files} entries, {size / 1024**2:.1f} MB in `{store.store_dir()}`."
+    )
+    st.dataframe(pd.DataFrame([store.stats]), hide_index=True, use_container_width=True)
+
+st.header("Background jobs")
+
+st.write(
+    "Slow derived data is built on one background worker. Sessions asking for the same artifact share a job, so each row is one build; waited is the time spent in the queue."
+)
+
+job_table = jobs.job_table()
+if job_table.empty:
+    st.write("No page has asked for a background job yet.")
+else:
+    st.dataframe(
+        job_table,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "progress": st.column_config.ProgressColumn(
+                "progress", format="percent", min_value=0, max_value=1
+            ),
+            "waited_s": st.column_config.NumberColumn("waited (s)", format="%.2f"),
+            "build_s": st.column_config.NumberColumn("build (s)", format="%.2f"),
+        },
+    )
+
+st.header("Rerun latency")
+
+reruns = rerun_table()
+if reruns.empty:
+    st.write("No page has finished a rerun yet.")
+else:
+    summary = reruns.groupby("page")["total_s"].describe(percentiles=[0.5, 0.95])
+    st.dataframe(summary[["count", "50%", "95%", "max"]], use_container_width=True)
+
+    fig = px.histogram(
+        reruns,
+        x="total_s",
+        color="page",
+        nbins=50,
+        barmode="overlay",
+        opacity=0.7,
+        color_discrete_sequence=px.colors.qualitative.Pastel1,
+    )
+    fig.update_layout(
+        title={"text": "Rerun time per page", "font": {"size": 24}},
+        xaxis_title="Seconds",
+        yaxis_title="Reruns",
+        legend={"title": "Page"},
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+st.caption(f"Generated at {time.strftime('%H:%M:%S')}.")
@@ -0,0 +1,87 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+import warnings
+
+from utils import sql
+from utils.data import DECADES, data_version
+from utils.timing import plotly_chart, render_timings, section, start_run
+from utils.warmup import warm_up_notice
+
+warnings.filterwarnings("ignore")
+
+pio.templates.default = "plotly_dark"
+
+pd.set_option("display.precision", 2)
+
+start_run("sql query")
+
+st.set_page_config(page_title="SQL Query", layout="wide")
+
+if not sql.sql_page_enabled():
+    st.info("Custom queries are switched off on this server.")
+    st.stop()
+
+warm_up_notice()
+
+st.title("Ask your own questions")
+st.write("")
+
+st.write(
+    "The pages only show the questions I thought of, so here you can write your own query against the tracks. Every track is in the `tracks` table, and each decade also has its own table (`data_1950s`, `data_1960s` and so on), which is faster when you only need one decade. The data is read only, so feel free to experiment."
+)
+
+with st.expander("Tables and columns"):
+    st.write(", ".join(["`tracks`"] + [f"`{sql.table_name(d)}`" for d in DECADES]))
+    st.dataframe(sql.schema(), use_container_width=True, hide_index=True)
+
+default_query = (
+    "SELECT decade, ROUND(AVG(valence), 3) AS valence, COUNT(*) AS tracks\n"
+    "FROM tracks\n"
+    "GROUP BY decade\n"
+    "ORDER BY decade"
+)
+
+text = st.text_area("Query:", default_query, height=150)
+
+if not text.strip():
+    st.write("Write a query to see the results.")
+    st.stop()
+
+try:
+    with section("query"):
+        result = sql.cached_query(text, data_version())
+except sql.QueryError as e:
+    st.error(f"The query failed: {e}")
+    st.stop()
+
+st.dataframe(result, use_container_width=True, hide_index=True)
+caption = (
+    f"{len(result):,} rows, run with {sql.engine_name()}."
+    f" Queries are stopped after {sql.query_timeout():g} seconds."
+)
+if len(result) == sql.MAX_ROWS:
+    caption += f" Only the first {sql.MAX_ROWS:,} rows are shown."
+st.caption(caption)
+
+# A quick chart when the result looks like a category and some numbers.
+numeric = result.select_dtypes("number").columns.drop(
+    result.columns[0], errors="ignore"
+)
+if len(result.columns) > 1 and len(numeric) and len(result) <= 200:
+    st.write("")
+    fig = px.bar(
+        data_frame=result,
+        x=result.columns[0],
+        y=list(numeric),
+        barmode="group",
+        color_discrete_sequence=px.colors.qualitative.Pastel1,
+    )
+    fig.update_layout(
+        title={"text": "Query results", "font": {"size": 24}},
+        legend={"title": "Column"},
+    )
+    plotly_chart(fig, use_container_width=True)
+
+render_timings()
@@ -1,22 +1,27 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import plotly.io as pio
 import warnings
 
+from utils.figures import load_overall_figures
+from utils.timing import plotly_chart, render_timings, section, start_run
+from utils.warmup import warm_up_notice
+
 warnings.filterwarnings("ignore")
 
 pio.templates.default = "plotly_dark"
 
 pd.set_option("display.precision", 2)
 
-df = pd.read_csv("pages/csv_files/clean_data.csv")
+start_run("overall")
+
+with section("figures"):
+    figures = load_overall_figures()
 
 st.set_page_config(page_title="Overall Analysis", layout="wide")
 
+warm_up_notice()
+
 st.title("Overall Information")
 st.write("")
 st.header("A very general overview")
@@ -41,36 +46,7 @@ st.write(
 
 st.write("")
 
-fig = px.bar(
-    data_frame=(
-        df["decade"].value_counts().sort_values(ascending=False).reset_index(drop=False)
-    ),
-    y="decade",
-    x="count",
-    color="count",
-    color_continuous_scale=px.colors.sequential.Sunset,
-    text_auto=True,
-)
-
-fig.update_layout(
-    title={"text": "Total songs per decade", "font": {"size": 24}},
-    xaxis_title="Count",
-    yaxis_title="Decades",
-    coloraxis_colorbar={
-        "title": "Count",
-        "thicknessmode": "pixels",
-        "thickness": 20,
-        "lenmode": "pixels",
-        "len": 300,
-        "yanchor": "top",
-        "xanchor": "right",
-        "y": 1.2,
-        "x": 0.95,
-        "orientation": "h",
-    },
-    margin={"r": 10},
-)
-st.plotly_chart(fig, use_container_width=True)
+plotly_chart(figures["count"], use_container_width=True)
 
 st.write("")
 
@@ -87,178 +63,7 @@ st.write(
 st.subheader("An overall oversight")
 st.write("")
 
-cols = [
-    "valence",
-    "acousticness",
-    "danceability",
-    "duration_min",
-    "energy",
-    "instrumentalness",
-    "liveness",
-    "loudness",
-    "popularity",
-    "speechiness",
-    "tempo",
-]
-
-decade_mean = df.groupby("decade")[cols].mean()
-
-fig = make_subplots(
-    rows=4,
-    cols=3,
-    subplot_titles=(
-        decade_mean.columns[0],
-        decade_mean.columns[1],
-        decade_mean.columns[2],
-        decade_mean.columns[3],
-        decade_mean.columns[4],
-        decade_mean.columns[5],
-        decade_mean.columns[6],
-        decade_mean.columns[7],
-        decade_mean.columns[8],
-        decade_mean.columns[9],
-        decade_mean.columns[10],
-    ),
-    vertical_spacing=0.1,
-)
-
-fig.add_trace(
-    go.Bar(
-        y=decade_mean.index,
-        x=decade_mean.iloc[:, 0],
-        name=decade_mean.columns[0],
-        orientation="h",
-    ),
-    row=1,
-    col=1,
-)
-
-fig.add_trace(
-    go.Bar(
-        y=decade_mean.index,
-        x=decade_mean.iloc[:, 1],
-        name=decade_mean.columns[1],
-        orientation="h",
-    ),
-    row=1,
-    col=2,
-)
-
-fig.add_trace(
-    go.Bar(
-        y=decade_mean.index,
-        x=decade_mean.iloc[:, 2],
-        name=decade_mean.columns[2],
-        orientation="h",
-    ),
-    row=1,
-    col=3,
-)
-
-fig.add_trace(
-    go.Bar(
-        y=decade_mean.index,
-        x=decade_mean.iloc[:, 3],
-        name=decade_mean.columns[3],
-        orientation="h",
-    ),
-    row=2,
-    col=1,
-)
-
-fig.add_trace(
-    go.Bar(
-        y=decade_mean.index,
-        x=decade_mean.iloc[:, 4],
-        name=decade_mean.columns[4],
-        orientation="h",
-    ),
-    row=2,
-    col=2,
-)
-
-fig.add_trace(
-    go.Bar(
-        y=decade_mean.index,
-        x=decade_mean.iloc[:, 5],
-        name=decade_mean.columns[5],
-        orientation="h",
-    ),
-    row=2,
-    col=3,
-)
-
-fig.add_trace(
-    go.Bar(
-        y=decade_mean.index,
-        x=decade_mean.iloc[:, 6],
-        name=decade_mean.columns[6],
-        orientation="h",
-    ),
-    row=3,
-    col=1,
-)
-
-fig.add_trace(
-    go.Bar(
-        y=decade_mean.index,
-        x=decade_mean.iloc[:, 7],
-        name=decade_mean.columns[7],
-        orientation="h",
-    ),
-    row=3,
-    col=2,
-)
-
-fig.add_trace(
-    go.Bar(
-        y=decade_mean.index,
-        x=decade_mean.iloc[:, 8],
-        name=decade_mean.columns[8],
-        orientation="h",
-    ),
-    row=3,
-    col=3,
-)
-
-fig.add_trace(
-    go.Bar(
-        y=decade_mean.index,
-        x=decade_mean.iloc[:, 9],
-        name=decade_mean.columns[9],
-        orientation="h",
-    ),
-    row=4,
-    col=1,
-)
-
-fig.add_trace(
-    go.Bar(
-        y=decade_mean.index,
-        x=decade_mean.iloc[:, 10],
-        name=decade_mean.columns[10],
-        orientation="h",
-    ),
-    row=4,
-    col=2,
-)
-
-fig.update_layout(
-    title={"text": "Average Musical Values per Decade", "font": {"size": 22}},
-    legend={
-        "orientation": "v",
-        "yanchor": "top",
-        "y": 0.2,
-        "xanchor": "right",
-        "x": 0.9,
-    },
-    margin={"b": 10, "r": 10},
-    height=980,
-)
-
-st.plotly_chart(fig, use_container_width=True)
-
-del decade_mean
+plotly_chart(figures["means"], use_container_width=True)
 
 st.write(
     'We can observe several things: apparently, the most recent decade has been the saddest on terms of tracks... the new century has been the less acoustic (RIP MTV Unplugged), but overtime we have become more prone to dance. The duration of the songs has been around the same, but it has been decreasing the last decades and also the energy has been increasing over the decades, but the 2010s saw a reversal on the trend. The instrumentalness of the tracks has gone dramatically backwards decade after decade and the songs have been recorded "louder" (probably due to advancements on technology, but there is also a "loudness" war going on). Speechiness has been low overall, even though the graph seems like a dramatic reduction and the tempo has been around the same.'
@@ -276,30 +81,7 @@ st.write(
     "Now let us see other features, such as the evolution of explicit songs and per key/scale."
 )
 
-df["explicit"] = df["explicit"].map({0: "Not Explicit", 1: "Explicit"})
-
-fig = px.bar(
-    data_frame=(
-        df.groupby(["decade", "explicit"], as_index=False)["year"]
-        .count()
-        .rename(columns={"year": "count"})
-    ),
-    x="decade",
-    y="count",
-    color="explicit",
-    color_discrete_sequence=px.colors.qualitative.Pastel1,
-    text_auto=True,
-)
-
-fig.update_layout(
-    title={"text": "Count of explicit tracks per decade", "font": {"size": 24}},
-    barmode="group",
-    xaxis_title="Decade",
-    yaxis_title="Count",
-    legend={"title": "Explicit"},
-)
-
-st.plotly_chart(fig, use_container_width=True)
+plotly_chart(figures["explicit"], use_container_width=True)
 
 st.write("")
 
@@ -309,40 +91,7 @@ st.write(
 
 st.write("")
 
-key_mode_decade = pd.pivot_table(
-    data=df, index="key_mode", columns="decade", values="first_artist", aggfunc="count"
-)
-
-fig = px.imshow(
-    key_mode_decade.T,
-    aspect="auto",
-    color_continuous_scale=px.colors.sequential.Sunset,
-    text_auto=True,
-)
-
-fig.update_layout(
-    title={"text": "Count of songs per key per decade", "font": {"size": 24}},
-    coloraxis_colorbar={
-        "title": "Count",
-        "thicknessmode": "pixels",
-        "thickness": 20,
-        "lenmode": "pixels",
-        "len": 500,
-        "yanchor": "top",
-        "xanchor": "right",
-        "y": 1.2,
-        "x": 0.99,
-        "orientation": "h",
-    },
-    margin={"r": 10},
-    width=1200,
-    yaxis_title="Decade",
-    xaxis_title="Key",
-)
-
-st.plotly_chart(fig, use_container_width=True)
-
-del key_mode_decade
+plotly_chart(figures["key"], use_container_width=True)
 
 st.write("")
 
@@ -355,3 +104,5 @@ st.write()
 st.write(
     'Also the genre plays a role in the selection of the key: mainstream music normally use the most used keys seen in the graph above and genres such as jazz may even change key and scales through the song. Other factors such as the vocal range of the singer also play a BIG role: Whitney Houston, Mariah Carey, Beyoncé, Celine Dion, Freddie Mercury are examples of singers whose vocal ranges are so wide that they could sing in varied keys and they actually have different "genres" of songs (mostly mainstream, but you get the idea).'
 )
+
+render_timings()
@@ -0,0 +1,85 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+import warnings
+
+from utils.data import FEATURE_COLS
+from utils.timing import plotly_chart, render_timings, start_run
+from utils.warmup import warm_up_notice
+from utils.years import load_yearly_table
+
+warnings.filterwarnings("ignore")
+
+pio.templates.default = "plotly_dark"
+
+pd.set_option("display.precision", 2)
+
+start_run("yearly trends")
+
+st.set_page_config(page_title="Yearly Trends", layout="wide")
+
+warm_up_notice()
+
+st.title("Trends per year")
+st.write("")
+
+st.write(
+    "Until now everything has been grouped by decade, but every track also has the year it was released. Here you can follow each feature year by year, and smooth the lines with a rolling window should you want to see the trend rather than the noise."
+)
+
+st.write("")
+
+col_1, col_2, col_3 = st.columns([0.5, 0.25, 0.25])
+
+features = col_1.multiselect(
+    "Select features:", FEATURE_COLS, default=["valence", "energy", "danceability"]
+)
+stat = col_2.radio("Statistic:", ["mean", "median"], horizontal=True)
+window = col_3.slider("Rolling window (years):", 1, 15, 1)
+
+yearly = load_yearly_table(stat, window)
+
+if features:
+    fig = px.line(
+        data_frame=yearly.reset_index(drop=False),
+        x="year",
+        y=features,
+        color_discrete_sequence=px.colors.qualitative.Pastel1,
+        markers=window == 1,
+    )
+
+    fig.update_layout(
+        title={"text": f"Yearly {stat} per musical feature", "font": {"size": 24}},
+        xaxis_title="Year",
+        yaxis_title=stat.capitalize(),
+        legend={"title": "Feature"},
+    )
+
+    plotly_chart(fig, use_container_width=True)
+else:
+    st.write("Select at least one feature to plot.")
+
+st.write("")
+
+st.write(
+    "Keep in mind some features are in a different scale (loudness, tempo, duration and popularity), so it is better to plot them on their own. Below is the number of tracks per year, which is what each point is based on:"
+)
+
+fig = px.bar(
+    data_frame=yearly.reset_index(drop=False),
+    x="year",
+    y="count",
+    color="count",
+    color_continuous_scale=px.colors.sequential.Sunset,
+)
+
+fig.update_layout(
+    title={"text": "Total songs per year", "font": {"size": 24}},
+    xaxis_title="Year",
+    yaxis_title="Count",
+)
+
+plotly_chart(fig, use_container_width=True)
+
+render_timings()
@@ -0,0 +1,169 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+import warnings
+
+from utils.aggregates import load_aggregates
+from utils.data import DECADES, FEATURE_COLS
+from utils.sketches import load_sketches, sketch_quantiles
+from utils.timing import plotly_chart, render_timings, start_run
+from utils.warmup import warm_up_notice
+
+warnings.filterwarnings("ignore")
+
+pio.templates.default = "plotly_dark"
+
+pd.set_option("display.precision", 2)
+
+start_run("decade comparison")
+
+stats, hist = load_aggregates()
+sketches = load_sketches()
+
+st.set_page_config(page_title="Decade Comparison", layout="wide")
+
+warm_up_notice()
+
+st.title("Compare decades")
+st.write("")
+
+st.write(
+    "Flipping between pages is not the best way to compare two decades, so here you can pick the decades and the features and see them side by side. The first decade you select is used as the reference for the differences."
+)
+
+st.write("")
+
+col_1, col_2 = st.columns(2)
+
+select_decades = col_1.multiselect(
+    "Select decades:", DECADES, default=["1950s", "2010s"]
+)
+select_features = col_2.multiselect(
+    "Select features:", FEATURE_COLS, default=["valence", "energy", "acousticness"]
+)
+
+if len(select_decades) < 2 or not select_features:
+    st.write("Select at least two decades and one feature to compare.")
+    st.stop()
+
+base = select_decades[0]
+
+means = stats.pivot_table(index="feature", columns="decade", values="mean")
+stds = stats.pivot_table(index="feature", columns="decade", values="std")
+means = means.loc[select_features, select_decades]
+
+delta_df = means.sub(means[base], axis=0).drop(columns=base)
+delta_df.columns = [f"{decade} vs {base}" for decade in delta_df.columns]
+
+st.subheader("Mean values and differences")
+st.write("")
+
+col_1, col_2 = st.columns(2)
+col_1.dataframe(means, use_container_width=True)
+col_2.dataframe(delta_df, use_container_width=True)
+
+plot_df = (
+    means.sub(means[base], axis=0)
+    .div(stds.loc[select_features, base], axis=0)
+    .drop(columns=base)
+    .reset_index(drop=False)
+    .melt(id_vars="feature", var_name="decade", value_name="delta")
+)
+
+fig = px.bar(
+    data_frame=plot_df,
+    y="feature",
+    x="delta",
+    color="decade",
+    barmode="group",
+    orientation="h",
+    color_discrete_sequence=px.colors.qualitative.Pastel1,
+    text_auto=".2f",
+)
+
+fig.update_layout(
+    title={
+        "text": f"Change in the mean against {base} (in {base} standard deviations)",
+        "font": {"size": 24},
+    },
+    xaxis_title="Standardised difference",
+    yaxis_title="Feature",
+    legend={"title": "Decade"},
+)
+
+plotly_chart(fig, use_container_width=True)
+
+st.write("")
+
+st.subheader("Percentiles")
+st.write("")
+
+st.write(
+    "The means can be pulled by a few extreme tracks, so here are the quartiles of each decade, together with all the selected decades combined. You can also keep only the explicit or not explicit tracks."
+)
+
+select_explicit = st.radio(
+    "Tracks:", ["All", "Explicit", "Not Explicit"], horizontal=True
+)
+explicit = {"All": None, "Explicit": 1, "Not Explicit": 0}[select_explicit]
+
+quantiles = [0.25, 0.5, 0.75]
+quantile_names = ["25%", "Median", "75%"]
+
+groups = {decade: [decade] for decade in select_decades}
+groups["All selected"] = select_decades
+
+percentile_df = pd.concat(
+    {
+        name: sketch_quantiles(
+            sketches, quantiles, select_features, decade=decades, explicit=explicit
+        ).set_axis(quantile_names, axis=1)
+        for name, decades in groups.items()
+    },
+    names=["decade", "feature"],
+).unstack("decade")
+percentile_df = percentile_df.swaplevel(axis=1).reindex(
+    columns=pd.MultiIndex.from_product([list(groups), quantile_names])
+)
+
+st.dataframe(percentile_df, use_container_width=True)
+
+st.write("")
+
+st.write(
+    "Below the distribution of each feature per decade. As every decade has a different amount of tracks, the bars show the share of the tracks of the decade in each range instead of the count."
+)
+
+st.write("")
+
+colors = px.colors.qualitative.Pastel1
+
+for col in select_features:
+    col_hist = hist.query("feature == @col")
+    fig = go.Figure()
+    for n, decade in enumerate(select_decades):
+        decade_hist = col_hist.query("decade == @decade")
+        fig.add_trace(
+            go.Bar(
+                x=(decade_hist["bin_left"] + decade_hist["bin_right"]) / 2,
+                y=decade_hist["count"] / decade_hist["count"].sum(),
+                width=decade_hist["bin_right"] - decade_hist["bin_left"],
+                name=decade,
+                marker={"color": colors[n % len(colors)]},
+                opacity=0.6,
+            )
+        )
+    fig.update_layout(
+        title={"text": f"Distribution Plot {col}", "font": {"size": 24}},
+        barmode="overlay",
+        xaxis_title=f"{col}",
+        yaxis_title="Share of tracks",
+        yaxis_tickformat=".0%",
+        legend={"title": "Decade"},
+    )
+    plotly_chart(fig, use_container_width=True)
+    st.write("")
+
+render_timings()
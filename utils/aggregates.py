@@ -0,0 +1,238 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.bootstrap import N_BOOT, SEED, bootstrap_means, percentile_ci
+from utils.data import (
+    AGG_DIR,
+    DECADE_COLS,
+    DECADES,
+    FEATURE_COLS,
+    data_version,
+    read_decade,
+)
+from utils.diagnostics import tracked, tracked_build
+from utils.store import persisted
+
+STATS_PATH = AGG_DIR / "decade_stats.csv"
+HIST_PATH = AGG_DIR / "decade_hist.csv"
+DELTAS_PATH = AGG_DIR / "decade_deltas.csv"
+CIS_PATH = AGG_DIR / "decade_cis.csv"
+
+N_BINS = 50
+
+
+def feature_edges(partitions, cols=FEATURE_COLS, n_bins=N_BINS):
+    # The same edges are shared by every decade so their histograms can be
+    # compared (and summed) bin by bin.
+    lo = pd.concat([df[cols].min() for df in partitions.values()], axis=1).min(axis=1)
+    hi = pd.concat([df[cols].max() for df in partitions.values()], axis=1).max(axis=1)
+    return {col: np.linspace(lo[col], hi[col], n_bins + 1) for col in cols}
+
+
+def decade_stats(df, decade, cols=FEATURE_COLS):
+    values = df[cols].to_numpy(dtype=np.float64)
+    return pd.DataFrame(
+        {
+            "decade": decade,
+            "feature": cols,
+            "count": np.count_nonzero(~np.isnan(values), axis=0),
+            "sum": np.nansum(values, axis=0),
+            "sum_sq": np.nansum(values**2, axis=0),
+            "min": np.nanmin(values, axis=0),
+            "max": np.nanmax(values, axis=0),
+        }
+    )
+
+
+def decade_hist(df, decade, edges):
+    frames = []
+    for col, col_edges in edges.items():
+        counts, _ = np.histogram(df[col].dropna(), bins=col_edges)
+        frames.append(
+            pd.DataFrame(
+                {
+                    "decade": decade,
+                    "feature": col,
+                    "bin_left": col_edges[:-1],
+                    "bin_right": col_edges[1:],
+                    "count": counts,
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def finish_stats(stats):
+    stats = stats.copy()
+    stats["mean"] = stats["sum"] / stats["count"]
+    var = (stats["sum_sq"] - stats["count"] * stats["mean"] ** 2) / (stats["count"] - 1)
+    stats["std"] = np.sqrt(var.clip(lower=0))
+    return stats
+
+
+def build_aggregates(partitions, cols=FEATURE_COLS, n_bins=N_BINS):
+    edges = feature_edges(partitions, cols, n_bins)
+    stats = pd.concat(
+        [decade_stats(df, decade, cols) for decade, df in partitions.items()],
+        ignore_index=True,
+    )
+    hist = pd.concat(
+        [decade_hist(df, decade, edges) for decade, df in partitions.items()],
+        ignore_index=True,
+    )
+    return finish_stats(stats), hist
+
+
+def decade_boots(partitions, cols=FEATURE_COLS, n_boot=N_BOOT, seed=SEED):
+    decades = [d for d in DECADES if d in partitions]
+    return {
+        decade: bootstrap_means(partitions[decade][cols], n_boot, seed + n)
+        for n, decade in enumerate(decades)
+    }
+
+
+def decade_cis(partitions, cols=FEATURE_COLS, boots=None):
+    boots = decade_boots(partitions, cols) if boots is None else boots
+    frames = []
+    for decade, boot in boots.items():
+        ci_low, ci_high = percentile_ci(boot)
+        frames.append(
+            pd.DataFrame(
+                {
+                    "decade": decade,
+                    "feature": cols,
+                    "mean": partitions[decade][cols].mean().to_numpy(),
+                    "ci_low": ci_low,
+                    "ci_high": ci_high,
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def decade_deltas(partitions, cols=FEATURE_COLS, boots=None):
+    boots = decade_boots(partitions, cols) if boots is None else boots
+    decades = list(boots)
+    frames = []
+    for prev, curr in zip(decades, decades[1:]):
+        prev_mean = partitions[prev][cols].mean().to_numpy()
+        curr_mean = partitions[curr][cols].mean().to_numpy()
+        ci_low, ci_high = percentile_ci(boots[curr] - boots[prev])
+        frames.append(
+            pd.DataFrame(
+                {
+                    "from_decade": prev,
+                    "to_decade": curr,
+                    "feature": cols,
+                    "from_mean": prev_mean,
+                    "to_mean": curr_mean,
+                    "delta": curr_mean - prev_mean,
+                    "ci_low": ci_low,
+                    "ci_high": ci_high,
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_stats(partitions):
+    return save_stats(*build_aggregates(partitions))
+
+
+def save_stats(stats, hist):
+    AGG_DIR.mkdir(parents=True, exist_ok=True)
+    stats.to_csv(STATS_PATH, index=False)
+    hist.to_csv(HIST_PATH, index=False)
+    return stats, hist
+
+
+def write_intervals(partitions):
+    boots = decade_boots(partitions)
+    AGG_DIR.mkdir(parents=True, exist_ok=True)
+    decade_deltas(partitions, boots=boots).to_csv(DELTAS_PATH, index=False)
+    decade_cis(partitions, boots=boots).to_csv(CIS_PATH, index=False)
+
+
+def write_aggregates(partitions):
+    stats, hist = write_stats(partitions)
+    write_intervals(partitions)
+    return stats, hist
+
+
+@tracked("aggregates")
+def load_aggregates():
+    return _load_aggregates(data_version())
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+@tracked_build("aggregates")
+@persisted("aggregates")
+def _load_aggregates(version):
+    if STATS_PATH.exists() and HIST_PATH.exists():
+        return pd.read_csv(STATS_PATH), pd.read_csv(HIST_PATH)
+    return build_aggregates({d: read_decade(d) for d in DECADES})
+
+
+@tracked("deltas")
+def load_deltas():
+    return _load_deltas(data_version())
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+@tracked_build("deltas")
+@persisted("deltas")
+def _load_deltas(version):
+    if DELTAS_PATH.exists():
+        return pd.read_csv(DELTAS_PATH)
+    return decade_deltas({d: read_decade(d) for d in DECADES})
+
+
+@tracked("cis")
+def load_cis():
+    return _load_cis(data_version())
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+@tracked_build("cis")
+@persisted("cis")
+def _load_cis(version):
+    if CIS_PATH.exists():
+        return pd.read_csv(CIS_PATH)
+    return decade_cis({d: read_decade(d) for d in DECADES})
+
+
+def mean_errors(cis, decade, cols=FEATURE_COLS):
+    ci_df = cis.query("decade == @decade").set_index("feature").loc[cols]
+    return pd.DataFrame(
+        {
+            "err_minus": ci_df["mean"] - ci_df["ci_low"],
+            "err_plus": ci_df["ci_high"] - ci_df["mean"],
+        }
+    )
+
+
+def decade_means(df, cis, decade, cols=DECADE_COLS):
+    """Means of ``df`` with the decade's bootstrap 95% CIs as error bars.
+
+    The CIs are precomputed at build time; the mean values charts of the
+    exact pages all take their bars from here.
+    """
+    return df[cols].mean().to_frame("mean").join(mean_errors(cis, decade, cols))
+
+
+def delta_phrase(deltas, decade, feature, digits=2):
+    """Describe the change of ``feature`` into ``decade``, e.g. "increased in 0.13"."""
+    row = deltas.query("to_decade == @decade and feature == @feature").iloc[0]
+    direction = "increased" if row["delta"] >= 0 else "decreased"
+    phrase = f"{direction} in {abs(row['delta']):.{digits}f}"
+    if row["ci_low"] <= 0 <= row["ci_high"]:
+        phrase += " (which is within the noise of the data)"
+    return phrase
+
+
+if __name__ == "__main__":
+    from utils.data import write_manifest
+
+    write_manifest()
+    write_aggregates({d: read_decade(d) for d in DECADES})
@@ -0,0 +1,55 @@
+import pandas as pd
+import streamlit as st
+
+from utils.data import CSV_DIR, DECADES, FEATURE_COLS, data_version, read_decade
+from utils.diagnostics import tracked, tracked_build
+from utils.store import persisted
+
+ARTIST_INDEX_PATH = CSV_DIR / "aggregates" / "artist_index.csv"
+
+INDEX_KEYS = ["decade", "first_artist"]
+
+
+def artist_index(df, cols=FEATURE_COLS):
+    """Track count and per-feature sums for every artist of every decade.
+
+    Sums (rather than means) let two indexes be merged by adding them up.
+    """
+    grouped = df.groupby(INDEX_KEYS, sort=True)
+    index = grouped[cols].sum()
+    index.insert(0, "count", grouped.size())
+    return index.reset_index()
+
+
+def merge_artist_indexes(indexes):
+    merged = pd.concat(indexes, ignore_index=True)
+    return merged.groupby(INDEX_KEYS, sort=True, as_index=False).sum()
+
+
+def artist_means(index, decade, cols=FEATURE_COLS):
+    rows = index[index["decade"] == decade]
+    means = rows[cols].div(rows["count"], axis=0)
+    means.insert(0, "count", rows["count"])
+    means.insert(0, "first_artist", rows["first_artist"])
+    return means.reset_index(drop=True)
+
+
+def write_artist_index(partitions):
+    index = merge_artist_indexes([artist_index(df) for df in partitions.values()])
+    ARTIST_INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    index.to_csv(ARTIST_INDEX_PATH, index=False)
+    return index
+
+
+@tracked("artist_index")
+def load_artist_index():
+    return _load_artist_index(data_version())
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+@tracked_build("artist_index")
+@persisted("artist_index")
+def _load_artist_index(version):
+    if ARTIST_INDEX_PATH.exists():
+        return pd.read_csv(ARTIST_INDEX_PATH)
+    return merge_artist_indexes([artist_index(read_decade(d)) for d in DECADES])
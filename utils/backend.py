@@ -0,0 +1,101 @@
+"""Pick the engine that computes the grouped tables behind the pages.
+
+Every engine returns the same tables as ``utils.chunked.overall_tables``:
+
+- ``pandas``: chunked pandas, always available and single-threaded.
+- ``duckdb``: SQL over the imported partitions, see ``utils.sql``.
+- ``polars``: a lazy Polars query over the decade files. Only the columns
+  and rows a table needs are read (projection and predicate pushdown) and
+  the tables are computed together on all cores.
+
+``APP_BACKEND`` selects one; by default the first installed of duckdb,
+polars and pandas is used. DuckDB and Polars are optional dependencies.
+"""
+
+import os
+from importlib.util import find_spec
+
+from utils import sql
+from utils.chunked import OVERALL_COLS, chunked_overall_tables
+from utils.data import DECADES, FEATURE_COLS, partition_path
+
+BACKEND_ENV = "APP_BACKEND"
+AUTO_ORDER = ["duckdb", "polars", "pandas"]
+
+
+def scan_partitions(decades=None):
+    """Lazy frame over the decade files; nothing is read until collected."""
+    import polars as pl
+
+    return pl.concat(
+        [pl.scan_csv(partition_path(d)) for d in decades or DECADES],
+        how="diagonal_relaxed",
+    )
+
+
+def polars_overall_tables(cols=FEATURE_COLS):
+    """``utils.chunked.overall_tables`` computed by Polars."""
+    # Imported here, so the pages only pay for Polars when it is the engine.
+    import polars as pl
+
+    usecols = OVERALL_COLS + [col for col in cols if col not in OVERALL_COLS]
+    tracks = scan_partitions().select(usecols).filter(pl.col("decade").is_not_null())
+    queries = [
+        tracks.group_by("decade")
+        .agg(pl.len().cast(pl.Int64).alias("count"))
+        .sort(["count", "decade"], descending=[True, False]),
+        tracks.group_by("decade").agg(pl.col(cols).sum()).sort("decade"),
+        tracks.group_by("decade")
+        .agg(pl.col(cols).count().cast(pl.Int64))
+        .sort("decade"),
+        tracks.filter(pl.col("explicit").is_not_null())
+        .group_by(["decade", "explicit"])
+        .agg(pl.col("year").count().cast(pl.Int64))
+        .sort(["decade", "explicit"]),
+        tracks.filter(pl.col("key_mode").is_not_null())
+        .group_by(["key_mode", "decade"])
+        .agg(pl.col("first_artist").count().cast(pl.Int64))
+        .sort(["key_mode", "decade"]),
+    ]
+    # One collect for all five, so the shared scan is only read once.
+    count, sums, sizes, explicit, key = [
+        frame.to_pandas() for frame in pl.collect_all(queries)
+    ]
+    return {
+        "count": count.set_index("decade")["count"],
+        "sums": sums.set_index("decade"),
+        "sizes": sizes.set_index("decade"),
+        "explicit": explicit.set_index(["decade", "explicit"])["year"],
+        "key": key.set_index(["key_mode", "decade"])["first_artist"],
+    }
+
+
+ENGINES = {
+    "pandas": chunked_overall_tables,
+    "duckdb": sql.sql_overall_tables,
+    "polars": polars_overall_tables,
+}
+
+
+def available():
+    installed = {
+        "pandas": True,
+        "duckdb": sql.HAS_DUCKDB,
+        "polars": find_spec("polars") is not None,
+    }
+    return [name for name in AUTO_ORDER if installed[name]]
+
+
+def engine_name():
+    name = os.environ.get(BACKEND_ENV, "auto").lower()
+    if name == "auto":
+        return available()[0]
+    if name not in ENGINES:
+        raise ValueError(f"{BACKEND_ENV} must be one of: auto, {', '.join(ENGINES)}")
+    if name not in available():
+        raise ImportError(f"{BACKEND_ENV}={name} but {name} is not installed")
+    return name
+
+
+def overall_tables(engine=None, cols=FEATURE_COLS):
+    return ENGINES[engine or engine_name()](cols=cols)
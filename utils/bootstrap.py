@@ -0,0 +1,30 @@
+import numpy as np
+
+N_BOOT = 1000
+SEED = 42
+
+
+def resample_weights(n, size, rng):
+    # One row of the index matrix per replicate, turned into per-row draw
+    # counts so every feature can be resampled with a single matrix product.
+    idx = rng.integers(0, n, size=(size, n))
+    idx += np.arange(size)[:, None] * n
+    return np.bincount(idx.ravel(), minlength=size * n).reshape(size, n)
+
+
+def bootstrap_means(values, n_boot=N_BOOT, seed=SEED, batch=100):
+    """Return an (n_boot, n_features) array of resampled column means."""
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    rng = np.random.default_rng(seed)
+    out = np.empty((n_boot, values.shape[1]))
+    for start in range(0, n_boot, batch):
+        size = min(batch, n_boot - start)
+        weights = resample_weights(n, size, rng).astype(np.float64)
+        out[start : start + size] = weights @ values / n
+    return out
+
+
+def percentile_ci(boot, level=0.95):
+    alpha = (1 - level) / 2
+    return np.quantile(boot, [alpha, 1 - alpha], axis=0)
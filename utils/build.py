@@ -0,0 +1,410 @@
+"""Rebuild the derived data files, skipping whatever is already up to date.
+
+Usage (from the repository root):
+
+    python -m utils.build
+    python -m utils.build --force --jobs 1
+    python -m utils.build --steps stats sketches
+
+Every step declares the files it reads and writes. Their sha256 hashes are
+kept in ``build_state.json`` after a successful run, and a step only runs
+again when one of its inputs changed or one of its outputs is missing or was
+edited by hand. Steps whose dependencies are done run in parallel.
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from utils import store
+from utils.aggregates import (
+    AGG_DIR,
+    CIS_PATH,
+    DELTAS_PATH,
+    HIST_PATH,
+    STATS_PATH,
+    save_stats,
+    write_intervals,
+)
+from utils.artists import ARTIST_INDEX_PATH, write_artist_index
+from utils.chunked import CHUNK_ROWS, chunked_aggregates
+from utils.data import (
+    CSV_DIR,
+    DECADES,
+    MANIFEST_PATH,
+    data_version,
+    file_sha256,
+    partition_path,
+    read_decade,
+    write_manifest,
+)
+from utils.sample import SAMPLE_PATH, write_sample
+from utils.sketches import SKETCHES_PATH, write_sketches
+
+logger = logging.getLogger(__name__)
+
+CLEAN_PATH = CSV_DIR / "clean_data.csv"
+STATE_PATH = AGG_DIR / "build_state.json"
+PARTITION_PATHS = [partition_path(d) for d in DECADES]
+ROOT = CSV_DIR.parent.parent
+
+
+class Partitions:
+    """Reads the decade files once, for whichever step asks first."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frames = None
+
+    def __call__(self):
+        with self._lock:
+            if self._frames is None:
+                self._frames = {d: read_decade(d) for d in DECADES}
+            return self._frames
+
+
+def split_partitions(partitions):
+    # Same split as st_file.py always did, streamed in chunks so
+    # clean_data.csv never has to fit in memory. A decade file is only
+    # replaced when its contents actually change.
+    tmp_paths = {d: partition_path(d).with_suffix(".csv.tmp") for d in DECADES}
+    written = set()
+    for chunk in pd.read_csv(CLEAN_PATH, chunksize=CHUNK_ROWS):
+        chunk["artist_track"] = chunk["first_artist"] + " - " + chunk["name"]
+        for decade in DECADES:
+            part = chunk.query("decade == @decade")
+            if part.empty and decade in written:
+                continue
+            part.to_csv(
+                tmp_paths[decade],
+                mode="a" if decade in written else "w",
+                header=decade not in written,
+                index=False,
+            )
+            written.add(decade)
+    for decade, tmp_path in tmp_paths.items():
+        path = partition_path(decade)
+        if path.exists() and file_sha256(path) == file_sha256(tmp_path):
+            tmp_path.unlink()
+        else:
+            os.replace(tmp_path, path)
+
+
+def build_manifest(partitions):
+    write_manifest(partitions())
+
+
+def build_stats(partitions):
+    # Streams the decade files instead of using the shared frames.
+    save_stats(*chunked_aggregates())
+
+
+def build_intervals(partitions):
+    write_intervals(partitions())
+
+
+def build_sketches(partitions):
+    write_sketches(partitions())
+
+
+def build_artist_index(partitions):
+    write_artist_index(partitions())
+
+
+def build_sample(partitions):
+    write_sample(partitions())
+
+
+def build_figures(partitions):
+    # Filling the caches through the warm-up leaves every figure in the disk
+    # store, so the next server start only has to unpickle them.
+    from utils.warmup import warm_up
+
+    warm_up()
+    stamp_path().write_text(data_version() + "\n")
+
+
+def stamp_path():
+    return store.store_dir() / "build.stamp"
+
+
+STEPS = [
+    {
+        "name": "partitions",
+        "after": [],
+        "inputs": [CLEAN_PATH],
+        "outputs": PARTITION_PATHS,
+        "run": split_partitions,
+    },
+    {
+        "name": "stats",
+        "after": ["partitions"],
+        "inputs": PARTITION_PATHS,
+        "outputs": [STATS_PATH, HIST_PATH],
+        "run": build_stats,
+    },
+    {
+        "name": "intervals",
+        "after": ["partitions"],
+        "inputs": PARTITION_PATHS,
+        "outputs": [DELTAS_PATH, CIS_PATH],
+        "run": build_intervals,
+    },
+    {
+        "name": "sketches",
+        "after": ["partitions"],
+        "inputs": PARTITION_PATHS,
+        "outputs": [SKETCHES_PATH],
+        "run": build_sketches,
+    },
+    {
+        "name": "artist index",
+        "after": ["partitions"],
+        "inputs": PARTITION_PATHS,
+        "outputs": [ARTIST_INDEX_PATH],
+        "run": build_artist_index,
+    },
+    {
+        "name": "sample",
+        "after": ["partitions"],
+        "inputs": PARTITION_PATHS,
+        "outputs": [SAMPLE_PATH],
+        "run": build_sample,
+    },
+    {
+        # Written last, as utils.ingest does: a new manifest means a new data
+        # version, so the files derived from the partitions must be there first.
+        "name": "manifest",
+        "after": [
+            "partitions",
+            "stats",
+            "intervals",
+            "sketches",
+            "artist index",
+            "sample",
+        ],
+        "inputs": PARTITION_PATHS,
+        "outputs": [MANIFEST_PATH],
+        "run": build_manifest,
+    },
+    {
+        "name": "figures",
+        "after": [
+            "manifest",
+            "stats",
+            "intervals",
+            "sketches",
+            "artist index",
+            "sample",
+        ],
+        "inputs": [
+            MANIFEST_PATH,
+            STATS_PATH,
+            HIST_PATH,
+            DELTAS_PATH,
+            CIS_PATH,
+            SKETCHES_PATH,
+            ARTIST_INDEX_PATH,
+            SAMPLE_PATH,
+        ],
+        "outputs": None,  # the disk store stamp, resolved at run time
+        "run": build_figures,
+    },
+]
+
+
+def step_outputs(step):
+    return [stamp_path()] if step["outputs"] is None else step["outputs"]
+
+
+def relative(path):
+    try:
+        return str(path.relative_to(ROOT))
+    except ValueError:
+        return str(path)
+
+
+_hashes = {}
+
+
+def hashes(paths):
+    # Files are hashed at most once per content: the key changes whenever
+    # the file is rewritten.
+    result = {}
+    for path in paths:
+        if not path.exists():
+            continue
+        stat = path.stat()
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        if key not in _hashes:
+            _hashes[key] = file_sha256(path)
+        result[relative(path)] = _hashes[key]
+    return result
+
+
+def state_paths():
+    # The figures step's output is the local disk store, so its record stays
+    # next to it instead of in the committed state file.
+    return {STATE_PATH: False, store.store_dir() / "build_state.json": True}
+
+
+def read_state():
+    state = {"steps": {}}
+    for path in state_paths():
+        if path.exists():
+            state["steps"].update(json.loads(path.read_text())["steps"])
+    return state
+
+
+def write_state(state):
+    local = {s["name"] for s in STEPS if s["outputs"] is None}
+    for path, is_local in state_paths().items():
+        steps = {
+            name: record
+            for name, record in state["steps"].items()
+            if (name in local) == is_local
+        }
+        if not steps and not path.exists():
+            continue
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"steps": steps}, indent=2, sort_keys=True) + "\n")
+
+
+def step_record(step):
+    # Only content hashes, so the state does not change unless the files do.
+    return {"inputs": hashes(step["inputs"]), "outputs": hashes(step_outputs(step))}
+
+
+def why_rebuild(step, state, force):
+    """Return the reason a step has to run, or None when it is up to date."""
+    if step["name"] == "figures" and not store.enabled():
+        return None
+    outputs = step_outputs(step)
+    if not all(path.exists() for path in step["inputs"]):
+        if all(path.exists() for path in outputs):
+            # e.g. no clean_data.csv: the partitions are the source of truth.
+            return None
+        missing = [relative(p) for p in step["inputs"] if not p.exists()]
+        raise FileNotFoundError(f"missing inputs: {', '.join(missing)}")
+    if force:
+        return "forced"
+    recorded = state["steps"].get(step["name"])
+    if recorded is None:
+        return "never built"
+    if hashes(step["inputs"]) != recorded["inputs"]:
+        return "inputs changed"
+    if not all(path.exists() for path in outputs):
+        return "outputs missing"
+    if hashes(outputs) != recorded["outputs"]:
+        return "outputs modified"
+    return None
+
+
+def mark_built(names):
+    """Record steps as up to date after their outputs were updated some other
+    way, e.g. by ``utils.ingest``."""
+    state = read_state()
+    for step in STEPS:
+        if step["name"] in names:
+            state["steps"][step["name"]] = step_record(step)
+    write_state(state)
+
+
+def run_step(step, partitions):
+    start = time.perf_counter()
+    step["run"](partitions)
+    return time.perf_counter() - start
+
+
+def build(force=False, jobs=None, only=None):
+    """Run every out-of-date step and return a report per step."""
+    state = read_state()
+    steps = [s for s in STEPS if only is None or s["name"] in only]
+    selected = {s["name"] for s in steps}
+    pending = {s["name"]: s for s in steps}
+    report = {}
+    futures = {}
+    partitions = Partitions()
+
+    def finished(name):
+        return name in report or name not in selected
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        while pending or futures:
+            for name, step in list(pending.items()):
+                if not all(finished(dep) for dep in step["after"]):
+                    continue
+                del pending[name]
+                failed = [
+                    dep
+                    for dep in step["after"]
+                    if report.get(dep, {}).get("status") in ("failed", "blocked")
+                ]
+                if failed:
+                    report[name] = {"status": "blocked", "reason": failed[0]}
+                    continue
+                try:
+                    reason = why_rebuild(step, state, force)
+                except FileNotFoundError as e:
+                    report[name] = {"status": "failed", "reason": str(e)}
+                    continue
+                if reason is None:
+                    report[name] = {"status": "up to date"}
+                    continue
+                logger.info("Building %s (%s)", name, reason)
+                futures[pool.submit(run_step, step, partitions)] = (step, reason)
+
+            if not futures:
+                continue
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                step, reason = futures.pop(future)
+                name = step["name"]
+                try:
+                    seconds = future.result()
+                except Exception as e:
+                    logger.exception("Step %s failed", name)
+                    report[name] = {"status": "failed", "reason": repr(e)}
+                    continue
+                report[name] = {"status": "built", "reason": reason, "seconds": seconds}
+                state["steps"][name] = step_record(step)
+                # Save as we go, so an interrupted build keeps finished steps.
+                write_state(state)
+    return {s["name"]: report[s["name"]] for s in steps}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--force", action="store_true", help="rebuild every step")
+    parser.add_argument("--jobs", type=int, help="steps to run at the same time")
+    parser.add_argument(
+        "--steps", nargs="*", choices=[s["name"] for s in STEPS], help="subset"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(message)s")
+    logger.setLevel(logging.INFO)
+
+    start = time.perf_counter()
+    report = build(args.force, args.jobs, args.steps)
+    for name, result in report.items():
+        line = f"{name:>13}: {result['status']}"
+        if "seconds" in result:
+            line += f" in {result['seconds']:.2f}s"
+        if result.get("reason"):
+            line += f" ({result['reason']})"
+        print(line)
+    print(f"Total {time.perf_counter() - start:.2f}s")
+    return (
+        1 if any(r["status"] in ("failed", "blocked") for r in report.values()) else 0
+    )
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
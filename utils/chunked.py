@@ -0,0 +1,183 @@
+"""Aggregate the decade files in chunks, without loading a whole decade.
+
+Every function here gives the same result as its in-memory counterpart,
+using memory bounded by the chunk size. Check it with:
+
+    python -m utils.chunked --verify --chunksize 1000
+
+Counts, histograms and pivots match exactly; sums and means can only differ
+by floating point rounding, because the values are added in another order.
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from utils.aggregates import (
+    N_BINS,
+    build_aggregates,
+    decade_hist,
+    decade_stats,
+    finish_stats,
+)
+from utils.data import DECADES, FEATURE_COLS, partition_path, read_all, read_decade
+
+CHUNK_ROWS = 50_000
+
+OVERALL_COLS = ["decade", "explicit", "key_mode", "year", "first_artist"]
+
+
+def iter_chunks(decades=None, usecols=None, chunksize=CHUNK_ROWS):
+    """Yield ``(decade, chunk)`` pairs, one decade file after the other."""
+    for decade in decades or DECADES:
+        path = partition_path(decade)
+        if not path.exists():
+            continue
+        for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize):
+            yield decade, chunk
+
+
+def merge_stats(running, chunk_stats):
+    if running is None:
+        return chunk_stats
+    running[["count", "sum", "sum_sq"]] += chunk_stats[["count", "sum", "sum_sq"]]
+    running["min"] = np.fmin(running["min"], chunk_stats["min"])
+    running["max"] = np.fmax(running["max"], chunk_stats["max"])
+    return running
+
+
+def chunked_stats(chunks, cols=FEATURE_COLS):
+    running = {}
+    for decade, chunk in chunks:
+        running[decade] = merge_stats(
+            running.get(decade), decade_stats(chunk, decade, cols)
+        )
+    return pd.concat(running.values(), ignore_index=True)
+
+
+def chunked_hist(chunks, edges):
+    running = {}
+    for decade, chunk in chunks:
+        hist = decade_hist(chunk, decade, edges)
+        if decade in running:
+            running[decade]["count"] += hist["count"]
+        else:
+            running[decade] = hist
+    return pd.concat(running.values(), ignore_index=True)
+
+
+def stats_edges(stats, cols=FEATURE_COLS, n_bins=N_BINS):
+    # Same edges as feature_edges, from the minimum and maximum already in
+    # the stats.
+    lo = stats.groupby("feature")["min"].min()
+    hi = stats.groupby("feature")["max"].max()
+    return {col: np.linspace(lo[col], hi[col], n_bins + 1) for col in cols}
+
+
+def chunked_aggregates(decades=None, cols=FEATURE_COLS, chunksize=CHUNK_ROWS):
+    """Chunked ``build_aggregates``: one pass for the stats, one for the bins."""
+    usecols = ["decade", *cols]
+    stats = chunked_stats(iter_chunks(decades, usecols, chunksize), cols)
+    edges = stats_edges(stats, cols)
+    hist = chunked_hist(iter_chunks(decades, usecols, chunksize), edges)
+    return finish_stats(stats), hist
+
+
+def overall_tables(df, cols=FEATURE_COLS):
+    """Everything the Overall page draws, from one data frame."""
+    return {
+        "count": df["decade"].value_counts(),
+        "sums": df.groupby("decade")[cols].sum(),
+        "sizes": df.groupby("decade")[cols].count(),
+        "explicit": df.groupby(["decade", "explicit"])["year"].count(),
+        "key": df.groupby(["key_mode", "decade"])["first_artist"].count(),
+    }
+
+
+def add_tables(running, tables):
+    if running is None:
+        return tables
+    # Summing the concatenation keeps integer counts integer, where
+    # ``add(fill_value=0)`` would turn them into floats.
+    return {
+        name: pd.concat([running[name], table])
+        .groupby(level=list(range(table.index.nlevels)))
+        .sum()
+        for name, table in tables.items()
+    }
+
+
+def chunked_overall_tables(decades=None, cols=FEATURE_COLS, chunksize=CHUNK_ROWS):
+    """Chunked ``overall_tables``."""
+    running = None
+    usecols = OVERALL_COLS + [col for col in cols if col not in OVERALL_COLS]
+    for _, chunk in iter_chunks(decades, usecols, chunksize):
+        running = add_tables(running, overall_tables(chunk, cols))
+    return running
+
+
+def compare(name, expected, actual, exact, check_dtype=True):
+    try:
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(
+                expected,
+                actual,
+                check_exact=exact,
+                check_dtype=check_dtype,
+                rtol=1e-9,
+                check_like=True,
+            )
+        else:
+            pd.testing.assert_series_equal(
+                expected.sort_index(),
+                actual.sort_index(),
+                check_exact=exact,
+                check_dtype=check_dtype,
+            )
+    except AssertionError as e:
+        print(f"{name}: MISMATCH\n{e}")
+        return False
+    print(f"{name}: same ({'exact' if exact else 'rtol 1e-9'})")
+    return True
+
+
+def verify(chunksize=CHUNK_ROWS):
+    """Compare the chunked results with the in-memory ones; True if they agree."""
+    stats, hist = build_aggregates({d: read_decade(d) for d in DECADES})
+    chunk_stats, chunk_hist = chunked_aggregates(chunksize=chunksize)
+    ok = compare(
+        "stats counts",
+        stats[["decade", "feature", "count"]],
+        chunk_stats[["decade", "feature", "count"]],
+        exact=True,
+    )
+    ok &= compare(
+        "stats min/max", stats[["min", "max"]], chunk_stats[["min", "max"]], exact=True
+    )
+    ok &= compare("stats sums and means", stats, chunk_stats, exact=False)
+    ok &= compare("histograms", hist, chunk_hist, exact=True)
+
+    expected = overall_tables(read_all())
+    actual = chunked_overall_tables(chunksize=chunksize)
+    for name in expected:
+        ok &= compare(f"overall {name}", expected[name], actual[name], name != "sums")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--verify", action="store_true", help="compare with pandas")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        return 0 if verify(args.chunksize) else 1
+    stats, hist = chunked_aggregates(chunksize=args.chunksize)
+    print(stats.to_string())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
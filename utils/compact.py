@@ -0,0 +1,160 @@
+"""Check the compact in-memory layout of the decade frames.
+
+Usage (from the repository root):
+
+    python -m utils.compact            # memory per decade
+    python -m utils.compact --verify   # also compare the charts
+
+The cached frames use ``utils.data.COMPACT_DTYPES``. ``--verify`` builds
+every decade chart and the yearly table from the float64 frames and from the
+compact ones and checks the plotted values agree within ``RTOL``; counts and
+labels have to match exactly. It exits with 1 on any mismatch.
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from utils.aggregates import decade_means, load_cis
+from utils.data import DECADE_COLS, DECADES, FEATURE_COLS, compact, read_decade
+from utils.figures import (
+    explicit_count_figure,
+    fun_subplots_plotly,
+    key_count_figure,
+    key_counts,
+    mean_values_figure,
+    prepare_decade,
+)
+from utils.years import build_year_index, yearly_table
+
+# float32 keeps about 7 significant digits; the charts show 2 decimals.
+RTOL = 1e-5
+
+
+def frame_mb(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def memory_report(decades=DECADES):
+    rows = []
+    for decade in decades:
+        df = read_decade(decade)
+        small = compact(df)
+        rows.append(
+            {
+                "decade": decade,
+                "rows": len(df),
+                "float64_mb": frame_mb(df),
+                "compact_mb": frame_mb(small),
+                "numeric_mb": frame_mb(df.select_dtypes("number")),
+                "compact_numeric_mb": frame_mb(small.select_dtypes("number")),
+            }
+        )
+    report = pd.DataFrame(rows).set_index("decade")
+    report.loc["total"] = report.sum()
+    report["saved"] = 1 - report["compact_mb"] / report["float64_mb"]
+    return report
+
+
+def same_values(expected, actual):
+    """Numbers equal within ``RTOL``, everything else exactly equal."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        return expected.keys() == actual.keys() and all(
+            same_values(expected[key], actual[key]) for key in expected
+        )
+    if isinstance(expected, str) or isinstance(actual, str):
+        return expected == actual
+    expected, actual = np.asarray(expected), np.asarray(actual)
+    if expected.shape != actual.shape:
+        return False
+    if expected.dtype.kind in "fiu" and actual.dtype.kind in "fiu":
+        return bool(np.allclose(expected, actual, rtol=RTOL, equal_nan=True))
+    return bool((expected.astype(str) == actual.astype(str)).all())
+
+
+def same_figure(expected, actual):
+    # The traces hold the plotted values, the annotations and lines the
+    # means and medians. Their labels are rounded to 2 decimals, so a value
+    # right on a rounding boundary may print differently.
+    return (
+        len(expected.data) == len(actual.data)
+        and all(
+            same_values(old.to_plotly_json(), new.to_plotly_json())
+            for old, new in zip(expected.data, actual.data)
+        )
+        and same_values(
+            [a.y for a in expected.layout.annotations],
+            [a.y for a in actual.layout.annotations],
+        )
+        and same_values(
+            [s.y0 for s in expected.layout.shapes],
+            [s.y0 for s in actual.layout.shapes],
+        )
+    )
+
+
+def decade_figures(df, decade, cis):
+    prepared = prepare_decade(df)
+    figures = {
+        "mean values": mean_values_figure(decade_means(prepared, cis, decade)),
+        "explicit count": explicit_count_figure(
+            prepared["explicit"].value_counts().to_frame()
+        ),
+        "key count": key_count_figure(key_counts(prepared["key_mode"]).to_frame()),
+    }
+    for col in DECADE_COLS:
+        figures[f"distribution {col}"] = fun_subplots_plotly(df, col)
+    return figures
+
+
+def verify(decades=DECADES):
+    """Compare the charts from float64 and compact frames; True if they agree."""
+    cis = load_cis()
+    ok = True
+    frames, small_frames = [], []
+    for decade in decades:
+        df = read_decade(decade)
+        small = compact(df)
+        frames.append(df)
+        small_frames.append(small)
+        expected = decade_figures(df, decade, cis)
+        actual = decade_figures(small, decade, cis)
+        bad = [
+            name for name in expected if not same_figure(expected[name], actual[name])
+        ]
+        print(f"{decade}: {'MISMATCH in ' + ', '.join(bad) if bad else 'same'}")
+        ok &= not bad
+
+    for stat in ("mean", "median"):
+        expected = yearly_table(
+            *build_year_index(pd.concat(frames, ignore_index=True)), FEATURE_COLS, stat
+        )
+        actual = yearly_table(
+            *build_year_index(pd.concat(small_frames, ignore_index=True)),
+            FEATURE_COLS,
+            stat,
+        )
+        same = same_values(expected.index, actual.index) and same_values(
+            expected, actual
+        )
+        print(f"yearly {stat}: {'same' if same else 'MISMATCH'}")
+        ok &= same
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--verify", action="store_true", help="compare the charts")
+    args = parser.parse_args(argv)
+
+    print(memory_report().to_string(float_format="{:.2f}".format))
+    if args.verify:
+        print()
+        return 0 if verify() else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.diagnostics import tracked, tracked_build
+
+CSV_DIR = Path(__file__).resolve().parent.parent / "pages" / "csv_files"
+MANIFEST_PATH = CSV_DIR / "manifest.json"
+AGG_DIR = CSV_DIR / "aggregates"
+
+# The CSV files stay the source of truth. With APP_PARTITION_CODEC set to one
+# of CODECS, every decade is also kept as a Parquet copy compressed with that
+# codec, written the first time it is read and named after the mtime and size
+# of the CSV it came from. Compare them with ``python -m benchmarks.codecs``.
+PARTITION_CODEC_ENV = "APP_PARTITION_CODEC"
+CODECS = ["none", "snappy", "lz4", "zstd"]
+PARQUET_DIR = CSV_DIR.parent.parent / ".cache" / "partitions"
+
+DECADES = ["1950s", "1960s", "1970s", "1980s", "1990s", "2000s", "2010s"]
+
+# Decades that have their own page.
+PAGE_DECADES = ["1950s", "1960s", "1970s", "1980s", "1990s"]
+
+FEATURE_COLS = [
+    "valence",
+    "acousticness",
+    "danceability",
+    "duration_min",
+    "energy",
+    "instrumentalness",
+    "liveness",
+    "loudness",
+    "popularity",
+    "speechiness",
+    "tempo",
+]
+
+# Features shown on the decade pages (popularity has its own chart there).
+DECADE_COLS = [col for col in FEATURE_COLS if col != "popularity"]
+
+KEYS = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+MODES = ["Major", "Minor"]
+
+# Layout of the cached frames: float32 features, the smallest integers that
+# hold the values and categorical codes for the repeated strings. Roughly
+# halves the numeric memory; check the charts still match with
+# ``python -m utils.compact --verify``.
+COMPACT_DTYPES = {
+    **{col: "float32" for col in DECADE_COLS},
+    "popularity": "uint8",
+    "year": "int16",
+    "explicit": "uint8",
+    "key": pd.CategoricalDtype(KEYS),
+    "mode": pd.CategoricalDtype(MODES),
+    "key_mode": pd.CategoricalDtype([f"{k} - {m}" for k in KEYS for m in MODES]),
+    "decade": pd.CategoricalDtype(DECADES),
+}
+
+
+def partition_path(decade):
+    return CSV_DIR / f"data_{decade}.csv"
+
+
+def file_stamp(path):
+    stat = path.stat()
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def partition_codec():
+    codec = os.environ.get(PARTITION_CODEC_ENV, "csv").lower()
+    if codec not in ["csv", *CODECS]:
+        raise ValueError(f"{PARTITION_CODEC_ENV} must be csv or one of {CODECS}")
+    return codec
+
+
+def parquet_path(decade, codec, directory=PARQUET_DIR, stamp=None):
+    # Keyed on the CSV itself rather than the manifest, which the build
+    # only rewrites after the partitions.
+    stamp = stamp or file_stamp(partition_path(decade))
+    version = hashlib.sha256(stamp.encode()).hexdigest()[:16]
+    return directory / codec / f"data_{decade}-{version}.parquet"
+
+
+def write_parquet(df, path, codec):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp, index=False, compression=None if codec == "none" else codec)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    # Copies of older versions of the decade are no use any more.
+    decade = path.stem.rsplit("-", 1)[0]
+    for old in path.parent.glob(f"{decade}-*.parquet"):
+        if old != path:
+            old.unlink(missing_ok=True)
+
+
+def read_decade(decade, codec=None):
+    codec = codec or partition_codec()
+    if codec == "csv":
+        return pd.read_csv(partition_path(decade))
+    stamp = file_stamp(partition_path(decade))
+    path = parquet_path(decade, codec, stamp=stamp)
+    try:
+        return pd.read_parquet(path)
+    except FileNotFoundError:
+        pass
+    df = pd.read_csv(partition_path(decade))
+    # Only keep the copy if the CSV did not change while it was read.
+    if file_stamp(partition_path(decade)) == stamp:
+        write_parquet(df, path, codec)
+    return df
+
+
+def fits(values, dtype):
+    """True if ``values`` can be stored as ``dtype`` without losing any."""
+    if isinstance(dtype, pd.CategoricalDtype):
+        return bool(values.dropna().isin(dtype.categories).all())
+    dtype = np.dtype(dtype)
+    if dtype.kind in "iu":
+        info = np.iinfo(dtype)
+        return bool(
+            values.notna().all()
+            and values.between(info.min, info.max).all()
+            and (values % 1 == 0).all()
+        )
+    return True
+
+
+def compact(df):
+    # A column whose values do not fit, e.g. after a batch with a new key
+    # notation, simply keeps the dtype it was read with.
+    dtypes = {
+        col: dtype
+        for col, dtype in COMPACT_DTYPES.items()
+        if col in df and fits(df[col], dtype)
+    }
+    return df.astype(dtypes)
+
+
+def read_all(decades=None):
+    decades = DECADES if decades is None else decades
+    return pd.concat([read_decade(d) for d in decades], ignore_index=True)
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def partition_manifest(decade, df=None):
+    path = partition_path(decade)
+    df = pd.read_csv(path) if df is None else df
+    return {
+        "file": path.name,
+        "sha256": file_sha256(path),
+        "rows": len(df),
+        "schema": {col: str(dtype) for col, dtype in df.dtypes.items()},
+    }
+
+
+def combined_version(partitions):
+    digest = hashlib.sha256()
+    for decade in sorted(partitions):
+        digest.update(f"{decade}:{partitions[decade]['sha256']}".encode())
+    return digest.hexdigest()
+
+
+def build_manifest(partitions=None):
+    """Describe every partition file; ``partitions`` may pass the frames just written."""
+    partitions = partitions or {}
+    entries = {
+        decade: partition_manifest(decade, partitions.get(decade))
+        for decade in DECADES
+        if partition_path(decade).exists()
+    }
+    return {"version": combined_version(entries), "partitions": entries}
+
+
+def write_manifest(partitions=None):
+    manifest = build_manifest(partitions)
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    return manifest
+
+
+@lru_cache(maxsize=4)
+def _read_manifest(mtime_ns):
+    return json.loads(MANIFEST_PATH.read_text())
+
+
+def read_manifest():
+    try:
+        return _read_manifest(MANIFEST_PATH.stat().st_mtime_ns)
+    except FileNotFoundError:
+        return None
+
+
+def derived_stamp():
+    # The aggregates written by the build and by utils.ingest. The pages mix
+    # them with the partitions, so a cache must not outlive either.
+    return "-".join(
+        f"{path.name}:{file_stamp(path)}" for path in sorted(AGG_DIR.glob("*.csv"))
+    )
+
+
+def data_version(decade=None, derived=None):
+    """Content version of one partition, or of all of them when ``decade`` is None.
+
+    Cached loaders take this as an argument. The manifest hash is combined
+    with the file's mtime and size, so a partition replaced by hand is picked
+    up before the build runs again, and with the mtime and size of every
+    derived file, so whatever was cached while those were still being
+    rewritten is not served once they are done.
+    """
+    derived = derived_stamp() if derived is None else derived
+    if decade is None:
+        digest = hashlib.sha256()
+        for d in DECADES:
+            if partition_path(d).exists():
+                digest.update(f"{d}:{data_version(d, derived)}".encode())
+        return digest.hexdigest()
+    path = partition_path(decade)
+    if not path.exists():
+        return ""
+    manifest = read_manifest() or {"partitions": {}}
+    entry = manifest["partitions"].get(decade, {})
+    stamp = f"{entry.get('sha256', '')}:{file_stamp(path)}:{derived}"
+    return hashlib.sha256(stamp.encode()).hexdigest()
+
+
+@tracked("decade")
+def load_decade(decade):
+    return _load_decade(decade, data_version(decade))
+
+
+@tracked("all_decades")
+def load_all():
+    return _load_all(data_version())
+
+
+# The version arguments below are only part of the cache key.
+
+
+@st.cache_data(show_spinner=False, max_entries=2 * len(DECADES))
+@tracked_build("decade")
+def _load_decade(decade, version):
+    return compact(read_decade(decade))
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+@tracked_build("all_decades")
+def _load_all(version):
+    return pd.concat([load_decade(d) for d in DECADES], ignore_index=True)
@@ -0,0 +1,178 @@
+"""Process-wide counters behind the operator diagnostics page.
+
+Streamlit does not expose hit or eviction counts for its caches, so every
+cached loader is wrapped twice: ``tracked`` on the public function counts
+lookups and their latency, ``tracked_build`` on the cached builder counts the
+misses. A key that is built a second time must have been evicted (the app
+never clears its caches), which is how evictions are counted.
+"""
+
+import os
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+DIAGNOSTICS_ENV = "APP_DIAGNOSTICS"
+
+# Rerun latencies kept per page for the histograms.
+HISTORY = 1000
+
+_lock = threading.Lock()
+_caches = defaultdict(
+    lambda: {
+        "lookups": 0,
+        "lookup_s": 0.0,
+        "builds": 0,
+        "build_s": 0.0,
+        "evictions": 0,
+        "keys": {},
+    }
+)
+_reruns = defaultdict(lambda: deque(maxlen=HISTORY))
+
+
+def diagnostics_enabled():
+    """The diagnostics page is for operators: ``APP_DIAGNOSTICS=1`` or ``?diagnostics=1``."""
+    if os.environ.get(DIAGNOSTICS_ENV) == "1":
+        return True
+    try:
+        return st.query_params.get("diagnostics") == "1"
+    except Exception:
+        return False
+
+
+def value_bytes(value):
+    """Rough in-memory size of a cached value, cheap enough to take on every build."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(value_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(value_bytes(v) for v in value)
+    if hasattr(value, "data") and hasattr(value, "layout"):
+        # Plotly figures: the trace arrays are what takes the space.
+        return sum(
+            value_bytes(np.asarray(trace[axis]))
+            for trace in value.data
+            for axis in ("x", "y")
+            if trace[axis] is not None
+        )
+    return sys.getsizeof(value)
+
+
+def tracked(name):
+    """Count the lookups of a public cached loader."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with _lock:
+                    stats = _caches[name]
+                    stats["lookups"] += 1
+                    stats["lookup_s"] += time.perf_counter() - start
+
+        return wrapper
+
+    return decorator
+
+
+def tracked_build(name):
+    """Count the builds (cache misses) of a cached builder. Goes under ``st.cache_*``."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args):
+            start = time.perf_counter()
+            value = func(*args)
+            elapsed = time.perf_counter() - start
+            size = value_bytes(value)
+            with _lock:
+                stats = _caches[name]
+                stats["builds"] += 1
+                stats["build_s"] += elapsed
+                if args in stats["keys"]:
+                    stats["evictions"] += 1
+                stats["keys"][args] = size
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def record_rerun(page, seconds):
+    with _lock:
+        _reruns[page].append(seconds)
+
+
+def cache_table():
+    rows = []
+    with _lock:
+        for name, stats in sorted(_caches.items()):
+            lookups = stats["lookups"]
+            live = len(stats["keys"])
+            rows.append(
+                {
+                    "cache": name,
+                    "entries": live,
+                    "size_mb": sum(stats["keys"].values()) / 1024**2,
+                    "lookups": lookups,
+                    "misses": stats["builds"],
+                    "hit_rate": (
+                        (lookups - stats["builds"]) / lookups if lookups else np.nan
+                    ),
+                    "evictions": stats["evictions"],
+                    "avg_lookup_ms": (
+                        stats["lookup_s"] / lookups * 1000 if lookups else np.nan
+                    ),
+                    "avg_build_ms": (
+                        stats["build_s"] / stats["builds"] * 1000
+                        if stats["builds"]
+                        else np.nan
+                    ),
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def rerun_table():
+    with _lock:
+        rows = [
+            {"page": page, "total_s": seconds}
+            for page, history in _reruns.items()
+            for seconds in history
+        ]
+    return pd.DataFrame(rows, columns=["page", "total_s"])
+
+
+def current_rss_mb():
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / 1024**2
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
@@ -0,0 +1,599 @@
+import logging
+
+import numpy as np
+import plotly.express as px
+import streamlit as st
+
+from utils import jobs, store
+from utils.aggregates import decade_means, load_cis
+from utils.artists import artist_means, load_artist_index
+from utils.backend import overall_tables
+from utils.data import (
+    DECADE_COLS,
+    DECADES,
+    FEATURE_COLS,
+    data_version,
+    load_decade,
+)
+from utils.diagnostics import tracked, tracked_build
+from utils.sample import decade_sample, sample_counts, sample_means, sample_weights
+from utils.sketches import load_sketches, sketch_quantiles
+from utils.store import persisted
+
+logger = logging.getLogger(__name__)
+
+
+def fun_subplots_plotly(df, col, median_val=None, weights=None):
+    # Only needed for the distribution plots at the bottom of the pages.
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    # With ``weights`` (tracks per sampled track) the histogram shows the
+    # estimated counts of the whole decade.
+    if weights is None:
+        mean_val = df[col].mean()
+    else:
+        mean_val = np.average(df[col], weights=weights)
+    if median_val is None:
+        median_val = df[col].median()
+    fig = make_subplots(rows=1, cols=2, column_widths=[0.75, 0.25])
+
+    fig.add_trace(
+        go.Histogram(
+            x=df[col],
+            y=weights,
+            histfunc=None if weights is None else "sum",
+            name=f"Histogram {col}",
+            marker={"color": "#EBA0AC"},
+            nbinsx=50,
+        ),
+        row=1,
+        col=1,
+    )
+
+    fig.add_shape(
+        type="line",
+        xref="paper",
+        yref="y",
+        x0=-1,
+        x1=1,
+        y0=mean_val,
+        y1=mean_val,
+        row=1,
+        col=2,
+        line={"color": "#A6E3A1", "width": 3, "dash": "dot"},
+    )
+
+    fig.add_shape(
+        type="line",
+        xref="paper",
+        yref="y",
+        x0=-1,
+        x1=1,
+        y0=median_val,
+        y1=median_val,
+        row=1,
+        col=2,
+        line={"color": "#CBA6F7", "width": 3, "dash": "dot"},
+    )
+
+    fig.add_annotation(
+        xref="paper",
+        x=-0.7,
+        y=mean_val,
+        showarrow=True,
+        arrowhead=2,
+        text=f"Mean = {mean_val:.2f}",
+        row=1,
+        col=2,
+    )
+
+    fig.add_annotation(
+        xref="paper",
+        x=0.7,
+        y=median_val,
+        showarrow=True,
+        arrowhead=2,
+        text=f"Median = {median_val:.2f}",
+        row=1,
+        col=2,
+    )
+
+    fig.add_trace(
+        go.Box(y=df[col], name=f"Boxplot {col}", marker={"color": "#F9E2AF"}),
+        row=1,
+        col=2,
+    )
+
+    fig.update_layout(
+        title={"text": f"Distribution Plot {col}", "font": {"size": 24}},
+        legend={
+            "orientation": "h",
+            "yanchor": "bottom",
+            "y": 1.02,
+            "xanchor": "right",
+            "x": 1,
+        },
+    )
+    fig.update_yaxes(title_text="Count", row=1, col=1)
+    fig.update_yaxes(title_text=f"{col}", row=1, col=2)
+    fig.update_xaxes(title_text=f"{col}", row=1, col=1)
+    fig.update_xaxes(title_text="", row=1, col=2)
+
+    return fig
+
+
+def mean_values_figure(means):
+    """Bars of ``means`` (mean, err_minus and err_plus per feature)."""
+    new_df = means.copy()
+    new_df.loc["loudness", "mean"] = (new_df.loc["loudness", "mean"] * -1) / 10
+    new_df.loc["tempo", "mean"] = new_df.loc["tempo", "mean"] / 100
+
+    # The error bars need the same rescaling as the means (loudness is
+    # flipped, so its error bars swap sides).
+    err_cols = ["err_minus", "err_plus"]
+    new_df.loc["loudness", err_cols] = (
+        new_df.loc["loudness", ["err_plus", "err_minus"]].to_numpy() / 10
+    )
+    new_df.loc["tempo", err_cols] = new_df.loc["tempo", err_cols] / 100
+    new_df = new_df.rename(
+        index={"loudness": "loudness x 10", "tempo": "tempo x 100"}
+    ).sort_index()
+    new_df.index = new_df.index.str.capitalize()
+
+    fig = px.bar(
+        data_frame=new_df,
+        y=new_df.index,
+        x="mean",
+        error_x="err_plus",
+        error_x_minus="err_minus",
+        orientation="h",
+        color=new_df.index,
+        color_discrete_sequence=px.colors.qualitative.Pastel1,
+        text_auto=".2f",
+    )
+
+    fig.update_layout(
+        title={"text": "Mean values per musical feature", "font": {"size": 24}},
+        showlegend=False,
+    )
+    return fig
+
+
+def explicit_count_figure(counts):
+    """Bars of the ``count`` column per explicit label, with error bars when
+    ``counts`` also has an ``err`` column (estimates from the sample)."""
+    fig = px.bar(
+        data_frame=counts.reset_index(drop=False),
+        y="explicit",
+        x="count",
+        error_x="err" if "err" in counts else None,
+        orientation="h",
+        color="explicit",
+        color_discrete_sequence=px.colors.qualitative.Pastel1,
+        text_auto=True,
+    )
+
+    fig.update_layout(
+        title={"text": "Count of explicit tracks", "font": {"size": 24}},
+        xaxis_title="Count",
+        yaxis_title="",
+        showlegend=False,
+    )
+    return fig
+
+
+def key_counts(keys):
+    # Ties are ordered by name, so the bars come out the same whether the
+    # column is plain strings or categorical codes.
+    counts = keys.value_counts(sort=False)
+    counts = counts[counts > 0].sort_index(key=lambda index: index.astype(str))
+    return counts.sort_values(ascending=False, kind="stable")
+
+
+def key_count_figure(counts):
+    fig = px.bar(
+        data_frame=counts.reset_index(drop=False),
+        x="key_mode",
+        y="count",
+        error_y="err" if "err" in counts else None,
+        color="key_mode",
+        color_discrete_sequence=px.colors.qualitative.Pastel1,
+        text_auto=True,
+    )
+
+    fig.update_layout(
+        title={"text": "Count of tracks per key", "font": {"size": 24}},
+        xaxis_title="Count",
+        yaxis_title="",
+        showlegend=False,
+    )
+    return fig
+
+
+def top_artists(artists, min_tracks=30, top=50):
+    """Pick the most popular artists from one decade of the artist index."""
+    new_df = artists[["first_artist", "popularity", "count"]].rename(
+        columns={"popularity": "mean"}
+    )
+
+    # Same result as sklearn's MinMaxScaler, without importing sklearn.
+    popularity = new_df["mean"].to_numpy(dtype=np.float64)
+    pop_range = popularity.max() - popularity.min()
+    new_df["mean"] = (popularity - popularity.min()) / (pop_range if pop_range else 1)
+
+    new_df = new_df.query("count >= @min_tracks")
+
+    return (
+        new_df.sort_values(by="mean", ascending=True)
+        .drop("count", axis=1)
+        .reset_index(drop=True)
+        .tail(top)
+    )
+
+
+def top_artists_figure(new_df):
+    fig = px.bar(
+        data_frame=new_df,
+        y="first_artist",
+        x="mean",
+        color="mean",
+        color_continuous_scale=px.colors.sequential.Sunset,
+        orientation="h",
+        labels={"first_artist": "Artist", "mean": "Popularity"},
+    )
+
+    fig.update_layout(
+        title={"text": "Top 50 artist by popularity", "font": {"size": 24}},
+        coloraxis_colorbar={
+            "title": "Popularity (mean)",
+            "thicknessmode": "pixels",
+            "thickness": 20,
+            "lenmode": "pixels",
+            "len": 300,
+            "yanchor": "top",
+            "xanchor": "right",
+            "y": 1.05,
+            "x": 0.95,
+            "orientation": "h",
+        },
+        margin={"r": 10, "l": 10, "b": 10},
+        height=1500,
+        xaxis_title="Popularity",
+        yaxis_title="Artist",
+    )
+
+    fig.update_yaxes(tickfont={"size": 14})
+    return fig
+
+
+def artist_features(artists, names, cols=DECADE_COLS):
+    artist_df = artists.loc[
+        artists["first_artist"].isin(names), ["first_artist", *cols]
+    ]
+    artist_df = artist_df.reset_index(drop=True)
+
+    artist_df["loudness"] = (artist_df["loudness"] * -1) / 10
+    artist_df["tempo"] = artist_df["tempo"] / 100
+    artist_df = artist_df.rename(
+        columns={"loudness": "loudness x 10", "tempo": "tempo x 100"}
+    )
+    artist_df.columns = artist_df.columns.str.capitalize()
+    return artist_df
+
+
+def artist_figure(artist_df, select_artist):
+    plot_df = artist_df.query("First_artist == @select_artist")
+
+    plot_df = plot_df.T.iloc[1:, :].sort_index(ascending=True).reset_index(drop=False)
+
+    fig = px.bar(
+        data_frame=plot_df,
+        y="index",
+        x=plot_df.columns[1],
+        color="index",
+        color_discrete_sequence=px.colors.qualitative.Pastel1,
+        orientation="h",
+        text_auto=".2f",
+    )
+
+    fig.update_layout(
+        title={"text": f"Features for artist {select_artist}", "font": {"size": 24}},
+        legend={"title": "Feature"},
+        xaxis_title="Value",
+        yaxis_title="Feature",
+    )
+    return fig
+
+
+def overall_count_figure(counts):
+    fig = px.bar(
+        data_frame=(
+            counts.rename("count").sort_values(ascending=False).reset_index(drop=False)
+        ),
+        y="decade",
+        x="count",
+        color="count",
+        color_continuous_scale=px.colors.sequential.Sunset,
+        text_auto=True,
+    )
+
+    fig.update_layout(
+        title={"text": "Total songs per decade", "font": {"size": 24}},
+        xaxis_title="Count",
+        yaxis_title="Decades",
+        coloraxis_colorbar={
+            "title": "Count",
+            "thicknessmode": "pixels",
+            "thickness": 20,
+            "lenmode": "pixels",
+            "len": 300,
+            "yanchor": "top",
+            "xanchor": "right",
+            "y": 1.2,
+            "x": 0.95,
+            "orientation": "h",
+        },
+        margin={"r": 10},
+    )
+    return fig
+
+
+def overall_means_figure(sums, sizes, cols=FEATURE_COLS):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    decade_mean = sums[cols] / sizes[cols]
+
+    fig = make_subplots(
+        rows=4,
+        cols=3,
+        subplot_titles=tuple(decade_mean.columns),
+        vertical_spacing=0.1,
+    )
+
+    for n, col in enumerate(decade_mean.columns):
+        fig.add_trace(
+            go.Bar(
+                y=decade_mean.index,
+                x=decade_mean[col],
+                name=col,
+                orientation="h",
+            ),
+            row=n // 3 + 1,
+            col=n % 3 + 1,
+        )
+
+    fig.update_layout(
+        title={"text": "Average Musical Values per Decade", "font": {"size": 22}},
+        legend={
+            "orientation": "v",
+            "yanchor": "top",
+            "y": 0.2,
+            "xanchor": "right",
+            "x": 0.9,
+        },
+        margin={"b": 10, "r": 10},
+        height=980,
+    )
+    return fig
+
+
+def overall_explicit_figure(explicit):
+    explicit = explicit.rename("count").reset_index()
+    explicit["explicit"] = explicit["explicit"].map({0: "Not Explicit", 1: "Explicit"})
+    explicit = explicit.sort_values(["decade", "explicit"], ignore_index=True)
+
+    fig = px.bar(
+        data_frame=explicit,
+        x="decade",
+        y="count",
+        color="explicit",
+        color_discrete_sequence=px.colors.qualitative.Pastel1,
+        text_auto=True,
+    )
+
+    fig.update_layout(
+        title={"text": "Count of explicit tracks per decade", "font": {"size": 24}},
+        barmode="group",
+        xaxis_title="Decade",
+        yaxis_title="Count",
+        legend={"title": "Explicit"},
+    )
+    return fig
+
+
+def overall_key_figure(key):
+    key_mode_decade = key.unstack("decade")
+
+    fig = px.imshow(
+        key_mode_decade.T,
+        aspect="auto",
+        color_continuous_scale=px.colors.sequential.Sunset,
+        text_auto=True,
+    )
+
+    fig.update_layout(
+        title={"text": "Count of songs per key per decade", "font": {"size": 24}},
+        coloraxis_colorbar={
+            "title": "Count",
+            "thicknessmode": "pixels",
+            "thickness": 20,
+            "lenmode": "pixels",
+            "len": 500,
+            "yanchor": "top",
+            "xanchor": "right",
+            "y": 1.2,
+            "x": 0.99,
+            "orientation": "h",
+        },
+        margin={"r": 10},
+        width=1200,
+        yaxis_title="Decade",
+        xaxis_title="Key",
+    )
+    return fig
+
+
+def prepare_decade(df):
+    df = df.copy()
+    df["explicit"] = df["explicit"].map({0: "Not Explicit", 1: "Explicit"})
+    return df
+
+
+# Figures are cached as shared objects: unpickling a plotly figure costs as
+# much as building it, and st.plotly_chart only reads from it.
+
+
+@tracked("decade_figures")
+def load_decade_figures(decade):
+    return _load_decade_figures(decade, data_version(decade))
+
+
+@tracked("top_artists")
+def load_top_artists(decade):
+    return _load_top_artists(decade, data_version(decade))
+
+
+@tracked("artist_figure")
+def load_artist_figure(decade, artist):
+    return _load_artist_figure(decade, artist, data_version(decade))
+
+
+@tracked("distribution")
+def load_distribution_figure(decade, col):
+    return _load_distribution_figure(decade, col, data_version(decade))
+
+
+def _persist_distribution_figure(decade, col):
+    # Runs in a pool process: the figure only has to reach the disk store.
+    _load_distribution_figure(decade, col, data_version(decade))
+
+
+def build_distribution_figures(decade, version, report=None):
+    """Every exact distribution figure of a decade, for a background job.
+
+    ``version`` only keys the job; the figures go through the tracked loader
+    so the diagnostics count these lookups too. With more than one CPU and
+    the disk store on, the figures the store lacks are built on
+    ``jobs.process_pool()`` first and the loader reads them back in order.
+    """
+    cols = sorted(DECADE_COLS)
+    pool = jobs.process_pool() if store.enabled() else None
+    futures = {}
+    if pool is not None:
+        futures = {
+            col: pool.submit(_persist_distribution_figure, decade, col)
+            for col in cols
+            if not store.has_entry("distribution", (decade, col), version)
+        }
+    figures = {}
+    for col in cols:
+        if col in futures:
+            try:
+                futures[col].result()
+            except Exception:
+                # The loader builds it here instead.
+                logger.exception("Building the %s %s figure failed", decade, col)
+        figures[col] = load_distribution_figure(decade, col)
+        if report is not None:
+            report(len(figures), len(cols))
+    return figures
+
+
+@tracked("sample_figures")
+def load_sample_figures(decade):
+    return _load_sample_figures(decade, data_version(decade))
+
+
+@tracked("sample_distributions")
+def load_sample_distributions(decade):
+    return _load_sample_distributions(decade, data_version(decade))
+
+
+@tracked("overall_figures")
+def load_overall_figures():
+    return _load_overall_figures(data_version())
+
+
+@st.cache_resource(show_spinner=False, max_entries=2 * len(DECADES))
+@tracked_build("decade_figures")
+@persisted("decade_figures")
+def _load_decade_figures(decade, version):
+    df = prepare_decade(load_decade(decade))
+    return {
+        "mean values": mean_values_figure(decade_means(df, load_cis(), decade)),
+        "explicit count": explicit_count_figure(
+            df["explicit"].value_counts().to_frame()
+        ),
+        "key count": key_count_figure(key_counts(df["key_mode"]).to_frame()),
+    }
+
+
+@st.cache_resource(show_spinner=False, max_entries=2 * len(DECADES))
+@tracked_build("top_artists")
+@persisted("top_artists")
+def _load_top_artists(decade, version):
+    artists = artist_means(load_artist_index(), decade)
+    new_df = top_artists(artists)
+    artist_df = artist_features(artists, new_df["first_artist"])
+    return top_artists_figure(new_df), artist_df
+
+
+@st.cache_resource(show_spinner=False, max_entries=500)
+@tracked_build("artist_figure")
+def _load_artist_figure(decade, artist, version):
+    _, artist_df = load_top_artists(decade)
+    return artist_figure(artist_df, artist)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2 * len(DECADES) * len(DECADE_COLS))
+@tracked_build("distribution")
+@persisted("distribution")
+def _load_distribution_figure(decade, col, version):
+    # Every track is loaded here, so the label uses the exact median, the
+    # same one the box plot draws; the sketches are for the sample.
+    return fun_subplots_plotly(load_decade(decade), col)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2 * len(DECADES))
+@tracked_build("sample_figures")
+@persisted("sample_figures")
+def _load_sample_figures(decade, version):
+    # The fast mode of the decade pages: the summary and distribution
+    # figures estimated from the stratified sample.
+    sample = decade_sample(decade)
+    return {
+        "mean values": mean_values_figure(sample_means(sample)),
+        "explicit count": explicit_count_figure(
+            sample_counts(prepare_decade(sample), "explicit")
+        ),
+        "key count": key_count_figure(sample_counts(sample, "key_mode")),
+    }
+
+
+@st.cache_resource(show_spinner=False, max_entries=2 * len(DECADES))
+@tracked_build("sample_distributions")
+@persisted("sample_distributions")
+def _load_sample_distributions(decade, version):
+    sample = decade_sample(decade)
+    weights = sample_weights(sample)
+    medians = sketch_quantiles(load_sketches(), 0.5, DECADE_COLS, decade=decade)[0.5]
+    return {
+        col: fun_subplots_plotly(sample, col, medians[col], weights)
+        for col in DECADE_COLS
+    }
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+@tracked_build("overall_figures")
+@persisted("overall_figures")
+def _load_overall_figures(version):
+    # None of the engines needs every decade in memory at once.
+    tables = overall_tables()
+    return {
+        "count": overall_count_figure(tables["count"]),
+        "means": overall_means_figure(tables["sums"], tables["sizes"]),
+        "explicit": overall_explicit_figure(tables["explicit"]),
+        "key": overall_key_figure(tables["key"]),
+    }
@@ -0,0 +1,273 @@
+"""Append a batch of new tracks without rebuilding everything from scratch.
+
+Usage (from the repository root):
+
+    python -m utils.ingest new_tracks.csv [more_tracks.csv ...]
+
+The rows are appended to their decade files (and to ``clean_data.csv`` when
+it exists, so a later rebuild of the partitions keeps them) and the manifest,
+stats, histograms, sketches and artist index are updated from the batch
+alone. The derived files are written before the partitions and the manifest
+last, so a rerun never sees the new data with the old derived files. The
+bootstrap intervals need every value of a decade and the stratified sample is
+drawn again from every stratum, so they (and the figure store) are left to
+``utils.build``, which the command runs afterwards unless ``--no-build`` is
+given. A lock file makes a second ingest wait for the first.
+"""
+
+import argparse
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.aggregates import (
+    HIST_PATH,
+    STATS_PATH,
+    decade_stats,
+    finish_stats,
+)
+from utils.artists import ARTIST_INDEX_PATH, artist_index, merge_artist_indexes
+from utils.build import CLEAN_PATH, build, mark_built
+from utils.data import (
+    CSV_DIR,
+    DECADES,
+    FEATURE_COLS,
+    MANIFEST_PATH,
+    combined_version,
+    file_sha256,
+    partition_path,
+)
+from utils.sketches import SEGMENT_COLS, SKETCHES_PATH, build_sketches, compress
+
+logger = logging.getLogger(__name__)
+
+LOCK_PATH = CSV_DIR / ".ingest.lock"
+
+SUM_COLS = ["count", "sum", "sum_sq"]
+SKETCH_KEYS = SEGMENT_COLS + ["feature"]
+
+
+def year_decade(year):
+    # The decades run from 1 to 10, e.g. 1991 to 2000 is the 1990s.
+    return f"{(int(year) - 1) // 10 * 10}s"
+
+
+def prepare_batch(batch):
+    """Fill in the derived columns and check the batch fits the partitions."""
+    batch = batch.copy()
+    if "decade" not in batch:
+        batch["decade"] = batch["year"].map(year_decade)
+    if "key_mode" not in batch:
+        batch["key_mode"] = batch["key"] + " - " + batch["mode"]
+    if "artist_track" not in batch:
+        batch["artist_track"] = batch["first_artist"] + " - " + batch["name"]
+
+    unknown = sorted(set(batch["decade"]) - set(DECADES))
+    if unknown:
+        raise ValueError(f"Rows for unknown decades: {', '.join(unknown)}")
+    columns = pd.read_csv(partition_path(DECADES[0]), nrows=0).columns
+    missing = [col for col in columns if col not in batch]
+    if missing:
+        raise ValueError(f"Batch is missing columns: {', '.join(missing)}")
+    if batch[FEATURE_COLS].isna().any().any():
+        raise ValueError("Batch has missing feature values")
+    return batch[columns]
+
+
+@contextmanager
+def ingest_lock(path=LOCK_PATH):
+    with open(path, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def replace_file(path, write):
+    # ``write`` fills a temporary file next to ``path``, which then replaces
+    # it in one step.
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def write_derived(frames):
+    """Write every ``{path: frame}`` to a temporary file first, then move
+    them all into place, so a failure leaves the old files untouched."""
+    tmps = {}
+    try:
+        for path, frame in frames.items():
+            fd, tmps[path] = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            os.close(fd)
+            frame.to_csv(tmps[path], index=False)
+    except BaseException:
+        for tmp in tmps.values():
+            os.unlink(tmp)
+        raise
+    for path, tmp in tmps.items():
+        os.replace(tmp, path)
+
+
+def append_partitions(parts):
+    for decade, part in parts.items():
+        part.to_csv(partition_path(decade), mode="a", header=False, index=False)
+
+
+def append_clean_data(batch):
+    if not CLEAN_PATH.exists():
+        # The partitions are the source of truth, nothing to keep in step.
+        return
+    columns = pd.read_csv(CLEAN_PATH, nrows=0).columns
+    batch[columns].to_csv(CLEAN_PATH, mode="a", header=False, index=False)
+
+
+def update_manifest(parts):
+    manifest = json.loads(MANIFEST_PATH.read_text())
+    for decade, part in parts.items():
+        entry = manifest["partitions"][decade]
+        entry["sha256"] = file_sha256(partition_path(decade))
+        entry["rows"] += len(part)
+    manifest["version"] = combined_version(manifest["partitions"])
+    text = json.dumps(manifest, indent=2, sort_keys=True) + "\n"
+    replace_file(MANIFEST_PATH, lambda tmp: Path(tmp).write_text(text))
+    return manifest["version"]
+
+
+def update_stats(parts):
+    """Add the batch to the running count, sum and sum of squares per feature.
+
+    Returns the new stats and histograms, and False when a value fell outside
+    the shared histogram edges; it is counted in the outer bin for now, and
+    the next build recomputes the edges.
+    """
+    stats = pd.read_csv(STATS_PATH).set_index(["decade", "feature"])
+    hist = pd.read_csv(HIST_PATH)
+    in_range = True
+    for decade, part in parts.items():
+        new = decade_stats(part, decade).set_index(["decade", "feature"])
+        stats.loc[new.index, SUM_COLS] += new[SUM_COLS]
+        stats.loc[new.index, "min"] = np.fmin(stats.loc[new.index, "min"], new["min"])
+        stats.loc[new.index, "max"] = np.fmax(stats.loc[new.index, "max"], new["max"])
+
+        for feature in FEATURE_COLS:
+            rows = (hist["decade"] == decade) & (hist["feature"] == feature)
+            edges = np.append(
+                hist.loc[rows, "bin_left"].to_numpy(),
+                hist.loc[rows, "bin_right"].to_numpy()[-1],
+            )
+            values = part[feature].to_numpy(dtype=np.float64)
+            in_range &= bool(((values >= edges[0]) & (values <= edges[-1])).all())
+            counts, _ = np.histogram(np.clip(values, edges[0], edges[-1]), edges)
+            hist.loc[rows, "count"] += counts
+
+    stats = finish_stats(stats[SUM_COLS + ["min", "max"]].reset_index())
+    return stats, hist, in_range
+
+
+def update_sketches(parts):
+    # Only the segments the batch touches are compressed again, the others
+    # are kept as they are and in the same order.
+    sketches = pd.read_csv(SKETCHES_PATH)
+    new = pd.concat([build_sketches(part) for part in parts.values()])
+    touched = set(new[SKETCH_KEYS].itertuples(index=False, name=None))
+
+    frames = []
+    for keys, group in pd.concat([sketches, new]).groupby(SKETCH_KEYS, sort=False):
+        if keys in touched:
+            order = np.argsort(group["mean"].to_numpy(), kind="stable")
+            means, weights = compress(
+                group["mean"].to_numpy()[order], group["weight"].to_numpy()[order]
+            )
+            group = pd.DataFrame(
+                {**dict(zip(SKETCH_KEYS, keys)), "mean": means, "weight": weights}
+            )
+        frames.append(group)
+    return pd.concat(frames, ignore_index=True)
+
+
+def update_artist_index(parts):
+    index = pd.read_csv(ARTIST_INDEX_PATH)
+    new = [artist_index(part) for part in parts.values()]
+    return merge_artist_indexes([index, *new])
+
+
+def append_tracks(batch):
+    """Append new tracks and update the derived files incrementally.
+
+    Returns the rows added per decade and the new data version.
+    """
+    batch = prepare_batch(batch)
+    parts = {decade: part for decade, part in batch.groupby("decade", sort=True)}
+
+    with ingest_lock():
+        stats, hist, hist_in_range = update_stats(parts)
+        write_derived(
+            {
+                STATS_PATH: stats,
+                HIST_PATH: hist,
+                SKETCHES_PATH: update_sketches(parts),
+                ARTIST_INDEX_PATH: update_artist_index(parts),
+            }
+        )
+        append_partitions(parts)
+        append_clean_data(batch)
+        version = update_manifest(parts)
+
+        # Tell the build these files match the new partitions, so only the
+        # steps that need a full pass run again. clean_data.csv has the
+        # batch too, so the recorded partitions step is still a true split
+        # of it.
+        updated = ["partitions", "manifest", "sketches", "artist index"]
+        if hist_in_range:
+            updated.append("stats")
+        else:
+            logger.warning("Values outside the histogram range, stats need a rebuild")
+        mark_built(updated)
+
+    return {
+        "rows": {decade: len(part) for decade, part in parts.items()},
+        "version": version,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("batches", nargs="+", help="CSV files with new tracks")
+    parser.add_argument(
+        "--no-build", action="store_true", help="skip rebuilding the intervals"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(message)s")
+
+    start = time.perf_counter()
+    batch = pd.concat([pd.read_csv(path) for path in args.batches], ignore_index=True)
+    result = append_tracks(batch)
+    for decade, rows in result["rows"].items():
+        print(f"{decade}: {rows} tracks added")
+    print(
+        f"Data version {result['version'][:12]}"
+        f" ({time.perf_counter() - start:.2f}s)"
+    )
+
+    if not args.no_build:
+        for name, step in build().items():
+            print(f"{name}: {step['status']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Build slow derived data on a background worker instead of inside a rerun.
+
+A page asks for an artifact with ``request(name, build, *args)``. The first
+request queues a job; every later one, from any session, gets the same job
+back until it is done, so concurrent readers trigger a single build. The
+worker is one daemon thread per server process and runs the jobs in order.
+``build`` is called as ``build(*args, report=report)`` and may call
+``report(done, total)`` to show its progress. It should fill a Streamlit
+cache: the job does not keep the result, so the caches' ``max_entries`` still
+bound what stays in memory. Put the data version in ``args`` so new data
+means a new job.
+
+A job whose work splits into independent pieces can run them on
+``process_pool()``, which is None when the host has a single CPU so the job
+builds them itself.
+
+``show_when_ready`` draws a progress bar in place of a result that is not
+there yet and reruns the page once it is, or shows an error when the job has
+not finished after ``TIMEOUT_S``.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# A job that takes longer than this to finish is shown as a placeholder.
+WAIT_S = 0.25
+POLL_S = 1.0
+# A session stops waiting for a job this long after it was queued.
+TIMEOUT_S = 120
+# Finished jobs kept for the diagnostics page, on top of the ones waiting.
+HISTORY = 100
+# Upper bound on the processes a job can split its work across.
+MAX_PROCESSES = 4
+
+_lock = threading.Lock()
+_queue = queue.Queue()
+_jobs = {}
+_worker = None
+_pool = None
+
+
+def _report(job):
+    def report(done, total):
+        job.update(done=done, total=total)
+
+    return report
+
+
+def _run(job):
+    job.update(status="running", started=time.time())
+    try:
+        job.pop("build")(*job["args"], report=_report(job))
+        job["status"] = "done"
+    except Exception as exc:
+        logger.exception("Background job %r failed", job["name"])
+        job.update(status="failed", error=f"{type(exc).__name__}: {exc}")
+    job["finished"] = time.time()
+    job["event"].set()
+
+
+def _work():
+    while True:
+        job = _queue.get()
+        try:
+            _run(job)
+        finally:
+            _queue.task_done()
+
+
+def _start_worker():
+    global _worker
+    if _worker is None:
+        _worker = threading.Thread(target=_work, name="background-jobs", daemon=True)
+        _worker.start()
+
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def process_pool():
+    """A pool of spawned processes shared by the jobs, or None on one CPU.
+
+    The processes start on first use and are kept for later jobs, as a new
+    one has to import pandas and plotly before it can do any work.
+    """
+    global _pool
+    cpus = available_cpus()
+    if cpus < 2:
+        return None
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                min(cpus, MAX_PROCESSES), mp_context=get_context("spawn")
+            )
+        return _pool
+
+
+def _forget_old_jobs():
+    finished = [key for key, job in _jobs.items() if job["event"].is_set()]
+    for key in finished[: max(0, len(finished) - HISTORY)]:
+        del _jobs[key]
+
+
+def request(name, build, *args, retry=False):
+    """The job building ``name`` for ``args``, queued if nobody asked yet.
+
+    A failed job is handed back as it is, so a broken build is not retried
+    on every rerun; pass ``retry=True`` to queue it again (also one that ran
+    past ``TIMEOUT_S``).
+    """
+    key = (name, args)
+    with _lock:
+        job = _jobs.get(key)
+        if job is None or (retry and (job["status"] == "failed" or timed_out(job))):
+            job = {
+                "name": name,
+                "args": args,
+                "build": build,
+                "status": "queued",
+                "done": 0,
+                "total": 0,
+                "queued": time.time(),
+                "event": threading.Event(),
+            }
+            _jobs[key] = job
+            _forget_old_jobs()
+            _start_worker()
+            _queue.put(job)
+    return job
+
+
+def wait(job, timeout=WAIT_S):
+    """True once the job has finished, waiting at most ``timeout`` seconds."""
+    return job["event"].wait(timeout)
+
+
+def pending():
+    """The jobs that have not finished yet, oldest first."""
+    with _lock:
+        return [job for job in _jobs.values() if not job["event"].is_set()]
+
+
+def timed_out(job):
+    return not job["event"].is_set() and time.time() - job["queued"] > TIMEOUT_S
+
+
+def job_table():
+    with _lock:
+        jobs = list(_jobs.values())
+    rows = []
+    for job in jobs:
+        end = job.get("finished", time.time())
+        rows.append(
+            {
+                "job": job["name"],
+                "args": ", ".join(map(str, job["args"])),
+                "status": "timed out" if timed_out(job) else job["status"],
+                "progress": job["done"] / job["total"] if job["total"] else 0.0,
+                "waited_s": job.get("started", end) - job["queued"],
+                "build_s": end - job["started"] if "started" in job else None,
+                "error": job.get("error"),
+            }
+        )
+    return pd.DataFrame(
+        rows,
+        columns=["job", "args", "status", "progress", "waited_s", "build_s", "error"],
+    )
+
+
+def show_when_ready(name, build, *args, label=None):
+    """Return ``build(*args)`` once the job has filled its cache, or draw the
+    job's progress and return None.
+
+    While the job runs, a fragment polls it every ``POLL_S`` seconds and
+    reruns the whole page when it has finished or timed out, so the caller
+    gets the result (or an error) on that rerun.
+    """
+    job = request(name, build, *args)
+    if wait(job) and job["status"] == "done":
+        # A cache lookup now; rebuilt here only if it was evicted since.
+        return build(*args)
+    label = label or name
+    if job["status"] == "failed" or timed_out(job):
+        if job["status"] == "failed":
+            st.error(f"Could not build the {label}: {job['error']}")
+        else:
+            st.error(f"The {label} are taking too long, please try again later.")
+        if st.button("Try again", key=f"retry {name} {args}"):
+            request(name, build, *args, retry=True)
+            st.rerun()
+        return None
+
+    @st.fragment(run_every=POLL_S)
+    def progress():
+        if job["event"].is_set() or timed_out(job):
+            st.rerun()
+        if job["status"] == "queued":
+            text = f"The {label} are queued behind other work..."
+        else:
+            text = f"Preparing the {label} ({job['done']}/{job['total']})..."
+        st.progress(job["done"] / job["total"] if job["total"] else 0.0, text=text)
+
+    progress()
+    return None
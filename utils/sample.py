@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.bootstrap import SEED
+from utils.data import (
+    CSV_DIR,
+    DECADE_COLS,
+    DECADES,
+    compact,
+    data_version,
+    read_decade,
+)
+from utils.diagnostics import tracked, tracked_build
+from utils.store import persisted
+
+SAMPLE_PATH = CSV_DIR / "aggregates" / "decade_sample.csv"
+
+# Every (year, key_mode) stratum keeps the same share of its tracks, and at
+# least two so its variance can be estimated.
+STRATA = ["year", "key_mode"]
+SAMPLE_FRACTION = 0.05
+MIN_PER_STRATUM = 2
+Z = 1.96
+
+
+def stratified_sample(df, fraction=SAMPLE_FRACTION, seed=SEED):
+    rng = np.random.default_rng(seed)
+    parts = []
+    for _, stratum in df.groupby(STRATA, sort=True, observed=True):
+        n = min(len(stratum), max(MIN_PER_STRATUM, round(fraction * len(stratum))))
+        rows = np.sort(rng.choice(len(stratum), size=n, replace=False))
+        parts.append(stratum.iloc[rows].assign(stratum_size=len(stratum)))
+    return pd.concat(parts, ignore_index=True)
+
+
+def write_sample(partitions):
+    sample = pd.concat(
+        [stratified_sample(df) for df in partitions.values()], ignore_index=True
+    )
+    SAMPLE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    sample.to_csv(SAMPLE_PATH, index=False)
+    return sample
+
+
+@tracked("sample")
+def load_sample():
+    return _load_sample(data_version())
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+@tracked_build("sample")
+@persisted("sample")
+def _load_sample(version):
+    if SAMPLE_PATH.exists():
+        return compact(pd.read_csv(SAMPLE_PATH))
+    return compact(
+        pd.concat(
+            [stratified_sample(read_decade(d)) for d in DECADES], ignore_index=True
+        )
+    )
+
+
+def sample_weights(sample):
+    """Tracks of the decade each sampled track stands for."""
+    sizes = sample.groupby(STRATA, observed=True)["stratum_size"].transform("size")
+    return sample["stratum_size"] / sizes
+
+
+def stratified_means(sample, values):
+    """Estimate the decade mean of every column of ``values`` (rows aligned
+    with ``sample``) and its standard error, without replacement."""
+    groups = values.groupby([sample[col] for col in STRATA], observed=True)
+    n = groups.size()
+    N = sample.groupby(STRATA, observed=True)["stratum_size"].first()
+    W = N / N.sum()
+    means = groups.mean().mul(W, axis=0).sum()
+    var = groups.var(ddof=1).fillna(0).mul(W**2 * (1 - n / N) / n, axis=0).sum()
+    return means, np.sqrt(var)
+
+
+def sample_means(sample, cols=DECADE_COLS):
+    """Means with 95% error bars, shaped like the exact ones of the pages."""
+    means, se = stratified_means(sample, sample[cols].astype(np.float64))
+    return pd.DataFrame({"mean": means, "err_minus": Z * se, "err_plus": Z * se})
+
+
+def sample_counts(sample, col):
+    """Estimated tracks per value of ``col`` with their 95% error."""
+    dummies = pd.get_dummies(sample[col].astype(str), dtype=np.float64)
+    shares, se = stratified_means(sample, dummies)
+    total = sample.groupby(STRATA, observed=True)["stratum_size"].first().sum()
+    counts = pd.DataFrame(
+        {"count": (shares * total).round().astype(int), "err": Z * se * total}
+    )
+    counts.index.name = col
+    # Same order as the exact charts: most tracks first, ties by name.
+    return counts.sort_index().sort_values("count", ascending=False, kind="stable")
+
+
+def decade_sample(decade):
+    return load_sample().query("decade == @decade").reset_index(drop=True)
+
+
+def fast_mode_toggle(decade):
+    """Let the reader pick between the sample and every track; True for the sample."""
+    fast = st.toggle(
+        "Fast mode",
+        value=True,
+        key="fast_mode",
+        help="Draws the summary and distribution charts from a small stratified sample of the decade. Turn it off for the exact charts.",
+    )
+    if fast:
+        sample = decade_sample(decade)
+        st.caption(
+            f"Estimated from a sample of {len(sample):,} of the"
+            f" {int(sample_weights(sample).sum()):,} tracks of the decade,"
+            " stratified by year and key. The error bars are 95% margins, and"
+            " the numbers in the text still come from every track."
+        )
+    return fast
+
+
+if __name__ == "__main__":
+    write_sample({d: read_decade(d) for d in DECADES})
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.data import CSV_DIR, DECADES, FEATURE_COLS, data_version, read_decade
+from utils.diagnostics import tracked, tracked_build
+from utils.store import persisted
+
+SKETCHES_PATH = CSV_DIR / "aggregates" / "decade_sketches.csv"
+
+COMPRESSION = 200
+SEGMENT_COLS = ["decade", "explicit", "mode"]
+
+
+def compress(means, weights, compression=COMPRESSION):
+    """Merge sorted centroids so each one spans at most one unit of the
+    t-digest scale function k(q) = compression / (2 pi) * asin(2q - 1).
+
+    Centroids near the tails stay small and the ones around the median get
+    wider, which keeps percentiles accurate with a few hundred centroids.
+    """
+    order = np.argsort(means, kind="stable")
+    means, weights = means[order], weights[order]
+    if len(means) <= 2:
+        return means, weights
+
+    cum = np.cumsum(weights)
+    q_mid = (cum - weights / 2) / cum[-1]
+    k = compression / (2 * np.pi) * np.arcsin(2 * q_mid - 1)
+    cluster = np.floor(k - k[0]).astype(np.int64) + 1
+    # Keep the extremes as singletons so min and max stay exact after merges.
+    cluster[0] = 0
+    cluster[-1] = cluster[-2] + 1
+    _, cluster = np.unique(cluster, return_inverse=True)
+
+    new_weights = np.bincount(cluster, weights=weights)
+    new_means = np.bincount(cluster, weights=means * weights) / new_weights
+    return new_means, new_weights
+
+
+def build_sketch(values, compression=COMPRESSION):
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    return compress(values, np.ones_like(values), compression)
+
+
+def sketch_quantile(sketch, q):
+    means, weights = sketch
+    cum = np.cumsum(weights)
+    # Each centroid sits at the middle of the mass it represents.
+    centers = (cum - weights / 2) / cum[-1]
+    return np.interp(q, centers, means)
+
+
+def build_sketches(df, cols=FEATURE_COLS, compression=COMPRESSION):
+    frames = []
+    for keys, segment in df.groupby(SEGMENT_COLS, sort=True):
+        for col in cols:
+            means, weights = build_sketch(segment[col], compression)
+            frame = pd.DataFrame(
+                {
+                    **dict(zip(SEGMENT_COLS, keys)),
+                    "feature": col,
+                    "mean": means,
+                    "weight": weights,
+                }
+            )
+            frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_sketches(partitions):
+    sketches = pd.concat(
+        [build_sketches(df) for df in partitions.values()], ignore_index=True
+    )
+    SKETCHES_PATH.parent.mkdir(parents=True, exist_ok=True)
+    sketches.to_csv(SKETCHES_PATH, index=False)
+    return sketches
+
+
+@tracked("sketches")
+def load_sketches():
+    return _load_sketches(data_version())
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+@tracked_build("sketches")
+@persisted("sketches")
+def _load_sketches(version):
+    if SKETCHES_PATH.exists():
+        return pd.read_csv(SKETCHES_PATH)
+    return pd.concat(
+        [build_sketches(read_decade(d)) for d in DECADES], ignore_index=True
+    )
+
+
+def sketch_quantiles(sketches, q, cols=FEATURE_COLS, **filters):
+    """Merge the stored sketches matching ``filters`` and read quantiles off them.
+
+    ``filters`` maps a segment column to a value or list of values, e.g.
+    ``sketch_quantiles(sketches, 0.5, decade=["1950s", "1960s"], explicit=1)``.
+    Returns a DataFrame indexed by feature with one column per quantile.
+    """
+    mask = sketches["feature"].isin(cols)
+    for name, value in filters.items():
+        if value is None:
+            continue
+        values = value if isinstance(value, (list, tuple)) else [value]
+        mask &= sketches[name].isin(values)
+    selected = sketches[mask]
+
+    qs = np.atleast_1d(q)
+    rows = {}
+    for col in cols:
+        cells = selected[selected["feature"] == col]
+        if cells.empty:
+            rows[col] = np.full(len(qs), np.nan)
+            continue
+        sketch = compress(cells["mean"].to_numpy(), cells["weight"].to_numpy())
+        rows[col] = sketch_quantile(sketch, qs)
+    return pd.DataFrame.from_dict(rows, orient="index", columns=qs)
+
+
+if __name__ == "__main__":
+    write_sketches({d: read_decade(d) for d in DECADES})
@@ -0,0 +1,273 @@
+"""Embedded SQL over the decade files.
+
+The partitions are imported once per data version into a local database file
+under ``.cache/sql``, one table per decade (``data_1950s`` ...) plus a
+``tracks`` view over all of them. DuckDB is used when it is installed
+(vectorised and multi-threaded, and it only pages in what a query touches);
+otherwise the standard library's sqlite3 does the same job more slowly.
+
+Connections are opened read-only and without access to other files, so the
+query page cannot change the data or read anything else on the server. DuckDB
+gets at most ``APP_SQL_THREADS`` threads and ``APP_SQL_MEMORY`` of memory,
+and a query from the page is interrupted after ``APP_SQL_TIMEOUT_S`` seconds.
+The page itself is only shown with ``APP_SQL_PAGE=1``.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from importlib.util import find_spec
+
+import pandas as pd
+import streamlit as st
+
+from utils.data import DECADES, FEATURE_COLS, data_version, partition_path
+from utils.diagnostics import tracked, tracked_build
+from utils.store import store_dir
+
+# Checked without importing it: duckdb is only loaded once a query runs.
+HAS_DUCKDB = find_spec("duckdb") is not None
+
+SQL_PAGE_ENV = "APP_SQL_PAGE"
+THREADS_ENV = "APP_SQL_THREADS"
+MEMORY_ENV = "APP_SQL_MEMORY"
+TIMEOUT_ENV = "APP_SQL_TIMEOUT_S"
+
+TABLE = "tracks"
+MAX_ROWS = 10_000
+THREADS = 2
+MEMORY_LIMIT = "512MB"
+TIMEOUT_S = 10.0
+# Databases of older data versions are removed once the current one has
+# been around this long, so no other server process is still reading them.
+STALE_AFTER_S = 3600
+
+
+class QueryError(Exception):
+    """A query the engine rejected or could not finish."""
+
+
+class QueryTimeout(QueryError):
+    pass
+
+
+def engine_errors():
+    if HAS_DUCKDB:
+        import duckdb
+
+        return (sqlite3.Error, duckdb.Error)
+    return (sqlite3.Error,)
+
+
+def sql_page_enabled():
+    """Ad-hoc queries run on the shared server, so the page is opt-in."""
+    return os.environ.get(SQL_PAGE_ENV) == "1"
+
+
+def query_timeout():
+    return float(os.environ.get(TIMEOUT_ENV, TIMEOUT_S))
+
+
+def engine_name():
+    return "duckdb" if HAS_DUCKDB else "sqlite"
+
+
+def table_name(decade):
+    return f"data_{decade}"
+
+
+def union_sql():
+    selects = [f"SELECT * FROM {table_name(d)}" for d in DECADES]
+    return f"CREATE VIEW {TABLE} AS " + " UNION ALL ".join(selects)
+
+
+def database_path(version):
+    suffix = "duckdb" if HAS_DUCKDB else "sqlite"
+    return store_dir().parent / "sql" / f"tracks-{version[:16]}.{suffix}"
+
+
+def import_duckdb(path):
+    import duckdb
+
+    con = duckdb.connect(str(path))
+    try:
+        for decade in DECADES:
+            con.execute(
+                f"CREATE TABLE {table_name(decade)} AS"
+                " SELECT * FROM read_csv_auto(?, header = true)",
+                [str(partition_path(decade))],
+            )
+        con.execute(union_sql())
+    finally:
+        con.close()
+
+
+def import_sqlite(path):
+    con = sqlite3.connect(path)
+    try:
+        # One decade at a time, so the import never holds every partition.
+        for decade in DECADES:
+            pd.read_csv(partition_path(decade)).to_sql(
+                table_name(decade), con, index=False
+            )
+        con.execute(union_sql())
+        con.commit()
+    finally:
+        con.close()
+
+
+def deny_attach(action, *args):
+    return sqlite3.SQLITE_DENY if action == sqlite3.SQLITE_ATTACH else sqlite3.SQLITE_OK
+
+
+def remove_stale_databases(path):
+    # Only once the current database is old enough that every server
+    # process has moved on to it; tmp files of crashed imports go too.
+    if time.time() - path.stat().st_mtime < STALE_AFTER_S:
+        return
+    for old in path.parent.glob("tracks-*"):
+        if old != path:
+            old.unlink(missing_ok=True)
+
+
+def open_database(version):
+    path = database_path(version)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Build next to the final name and move it into place, so a
+        # concurrent reader never opens half an import. The tmp name is
+        # unique, another process may be importing the same version.
+        tmp = path.with_name(f"{path.name}.{os.getpid()}-{uuid.uuid4().hex}.tmp")
+        try:
+            (import_duckdb if HAS_DUCKDB else import_sqlite)(tmp)
+            if path.exists():
+                tmp.unlink()
+            else:
+                tmp.replace(path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+    remove_stale_databases(path)
+
+    if HAS_DUCKDB:
+        import duckdb
+
+        return duckdb.connect(
+            str(path),
+            read_only=True,
+            config={
+                "enable_external_access": False,
+                "threads": int(os.environ.get(THREADS_ENV, THREADS)),
+                "memory_limit": os.environ.get(MEMORY_ENV, MEMORY_LIMIT),
+                # Otherwise a query could SET the caps above away.
+                "lock_configuration": True,
+            },
+        )
+    con = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    con.set_authorizer(deny_attach)
+    return con
+
+
+@tracked("sql_connection")
+def connection():
+    return _connection(data_version())
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+@tracked_build("sql_connection")
+def _connection(version):
+    return open_database(version), threading.Lock()
+
+
+def run_query(con, sql, params, limit):
+    cursor = con.execute(sql, params or [])
+    if limit is None and HAS_DUCKDB:
+        return cursor.df()
+    rows = cursor.fetchall() if limit is None else cursor.fetchmany(limit)
+    return pd.DataFrame(rows, columns=[col[0] for col in cursor.description])
+
+
+def query(sql, params=None, limit=None, timeout=None):
+    """Run ``sql`` (with ``?`` placeholders) and return a data frame.
+
+    With ``limit`` only the first rows are fetched. With ``timeout`` the query
+    is interrupted after that many seconds and ``QueryTimeout`` is raised.
+    """
+    con, lock = connection()
+    if HAS_DUCKDB:
+        # Every thread gets its own cursor, DuckDB runs them in parallel.
+        cursor, held = con.cursor(), None
+    else:
+        # A sqlite connection can only be used by one thread at a time.
+        cursor, held = con, lock
+        lock.acquire()
+    timer = None
+    if timeout is not None:
+        timer = threading.Timer(timeout, cursor.interrupt)
+        timer.start()
+    try:
+        return run_query(cursor, sql, params, limit)
+    except engine_errors() as e:
+        if timer is not None and not timer.is_alive():
+            raise QueryTimeout(f"the query was stopped after {timeout:g}s") from e
+        raise QueryError(str(e)) from e
+    finally:
+        if timer is not None:
+            timer.cancel()
+        if held is None:
+            cursor.close()
+        else:
+            held.release()
+
+
+@st.cache_data(show_spinner=False, max_entries=100)
+def cached_query(sql, version, limit=MAX_ROWS):
+    return query(sql, limit=limit, timeout=query_timeout())
+
+
+def schema():
+    if HAS_DUCKDB:
+        return query(
+            "SELECT column_name, data_type FROM information_schema.columns"
+            " WHERE table_name = ? ORDER BY ordinal_position",
+            [TABLE],
+        )
+    return query(
+        "SELECT name AS column_name, type AS data_type"
+        f" FROM pragma_table_info('{TABLE}') ORDER BY cid"
+    )
+
+
+def sql_overall_tables(cols=FEATURE_COLS):
+    """``utils.chunked.overall_tables`` computed by the SQL engine."""
+    sums = ", ".join(f'SUM("{col}") AS "{col}"' for col in cols)
+    sizes = ", ".join(f'COUNT("{col}") AS "{col}"' for col in cols)
+    count = query(
+        f"SELECT decade, COUNT(*) AS count FROM {TABLE}"
+        " WHERE decade IS NOT NULL GROUP BY decade ORDER BY count DESC, decade"
+    )
+    explicit = query(
+        f"SELECT decade, explicit, COUNT(year) AS year FROM {TABLE}"
+        " WHERE decade IS NOT NULL AND explicit IS NOT NULL"
+        " GROUP BY decade, explicit ORDER BY decade, explicit"
+    )
+    key = query(
+        f"SELECT key_mode, decade, COUNT(first_artist) AS first_artist FROM {TABLE}"
+        " WHERE key_mode IS NOT NULL AND decade IS NOT NULL"
+        " GROUP BY key_mode, decade ORDER BY key_mode, decade"
+    )
+    return {
+        "count": count.set_index("decade")["count"],
+        "sums": query(
+            f"SELECT decade, {sums} FROM {TABLE}"
+            " WHERE decade IS NOT NULL GROUP BY decade ORDER BY decade"
+        ).set_index("decade"),
+        "sizes": query(
+            f"SELECT decade, {sizes} FROM {TABLE}"
+            " WHERE decade IS NOT NULL GROUP BY decade ORDER BY decade"
+        ).set_index("decade"),
+        "explicit": explicit.set_index(["decade", "explicit"])["year"],
+        "key": key.set_index(["key_mode", "decade"])["first_artist"],
+    }
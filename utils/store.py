@@ -0,0 +1,186 @@
+"""On-disk store that lets the expensive caches survive a server restart.
+
+Entries are pickles named after the cached function, the data and code
+versions they were built from and a digest of their arguments, so neither a
+rebuilt partition nor a deploy serves stale results. ``preload`` reads every entry of the current data
+versions into memory in one pass at startup and deletes the stale ones;
+preloaded entries of a data version that is no longer current are dropped on
+the next miss.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from functools import lru_cache, wraps
+from pathlib import Path
+
+from utils.data import DECADES, data_version
+
+logger = logging.getLogger(__name__)
+
+STORE_ENV = "APP_CACHE_STORE"
+STORE_DIR_ENV = "APP_CACHE_DIR"
+STORE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "store"
+
+_preloaded = {}
+_lock = threading.Lock()
+stats = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+
+def enabled():
+    return os.environ.get(STORE_ENV) != "0"
+
+
+def store_dir():
+    return Path(os.environ.get(STORE_DIR_ENV) or STORE_DIR)
+
+
+@lru_cache(maxsize=1)
+def code_version():
+    # Entries built by older code must not be served after a deploy, so the
+    # source of every module in utils is part of the key.
+    digest = hashlib.sha256()
+    for path in sorted(Path(__file__).resolve().parent.glob("*.py")):
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def entry_version(version):
+    return version[:16] + code_version()[:8]
+
+
+def entry_name(name, args, version):
+    digest = hashlib.sha256(repr(args).encode()).hexdigest()[:16]
+    return f"{name}-{entry_version(version)}-{digest}.pkl"
+
+
+def current_versions():
+    versions = {data_version()} | {data_version(d) for d in DECADES}
+    return {entry_version(version) for version in versions}
+
+
+def has_entry(name, args, version):
+    return (store_dir() / entry_name(name, args, version)).exists()
+
+
+def count(key):
+    # Script threads and the warm-up thread update the counters together.
+    with _lock:
+        stats[key] += 1
+
+
+def entry_file_version(filename):
+    return Path(filename).stem.rsplit("-", 2)[-2]
+
+
+def drop_stale():
+    """Forget preloaded entries whose data version is no longer current."""
+    versions = current_versions()
+    with _lock:
+        stale = [f for f in _preloaded if entry_file_version(f) not in versions]
+        for filename in stale:
+            del _preloaded[filename]
+    return len(stale)
+
+
+def read_entry(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def write_entry(path, value):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first so a crash never leaves half an entry.
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def persisted(name):
+    """Back a cached builder with the disk store.
+
+    The wrapped function must take the data version as its last positional
+    argument, like the private loaders in ``utils``.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args):
+            if not enabled():
+                return func(*args)
+            filename = entry_name(name, args[:-1], args[-1])
+            with _lock:
+                value = _preloaded.pop(filename, None)
+            if value is not None:
+                count("hits")
+                return value
+            path = store_dir() / filename
+            try:
+                value = read_entry(path)
+                count("hits")
+                return value
+            except FileNotFoundError:
+                pass
+            except Exception:
+                count("errors")
+                logger.warning("Ignoring unreadable cache entry %s", path.name)
+            count("misses")
+            # A miss is usually a new data version, which makes the entries
+            # preloaded for the old one useless.
+            drop_stale()
+            value = func(*args)
+            try:
+                write_entry(path, value)
+                count("writes")
+            except Exception:
+                count("errors")
+                logger.exception("Could not persist cache entry %s", path.name)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def preload():
+    """Load every current entry into memory and delete the stale ones.
+
+    Returns the number of entries loaded.
+    """
+    directory = store_dir()
+    if not enabled() or not directory.exists():
+        return 0
+    versions = current_versions()
+    loaded = {}
+    for path in directory.glob("*.pkl"):
+        if entry_file_version(path.name) not in versions:
+            path.unlink(missing_ok=True)
+            continue
+        try:
+            loaded[path.name] = read_entry(path)
+        except Exception:
+            count("errors")
+            logger.warning("Ignoring unreadable cache entry %s", path.name)
+    with _lock:
+        _preloaded.update(loaded)
+    return len(loaded)
+
+
+def clear():
+    with _lock:
+        _preloaded.clear()
+    for path in store_dir().glob("*.pkl"):
+        path.unlink(missing_ok=True)
+
+
+def disk_usage():
+    paths = list(store_dir().glob("*.pkl"))
+    return len(paths), sum(p.stat().st_size for p in paths)
@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+import plotly.io as pio
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils.diagnostics import record_rerun
+
+TIMINGS_KEY = "_section_timings"
+
+DEBUG_ENV = "APP_DEBUG"
+METRICS_ENV = "APP_METRICS_FILE"
+TRACE_MEMORY_ENV = "APP_TRACE_MEMORY"
+CHART_BUDGET_ENV = "APP_CHART_BUDGET_KB"
+PAGE_BUDGET_ENV = "APP_PAGE_BUDGET_KB"
+
+CHART_BUDGET_KB = 500
+PAGE_BUDGET_KB = 3000
+
+logger = logging.getLogger(__name__)
+
+# Allocation tracking slows down every session of the process, so it is
+# decided once at startup rather than by whoever opens a page with ?debug=1.
+if os.environ.get(TRACE_MEMORY_ENV) == "1" and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+def debug_enabled():
+    if os.environ.get(DEBUG_ENV) == "1":
+        return True
+    try:
+        return st.query_params.get("debug") == "1"
+    except Exception:
+        return False
+
+
+def current_run():
+    # Cached builders can also run on background threads (e.g. the warm-up),
+    # where there is no session to record into.
+    if get_script_run_ctx() is None:
+        return None
+    return st.session_state.get(TIMINGS_KEY)
+
+
+def start_run(page):
+    """Reset the timings for this rerun. Call once at the top of a page."""
+    st.session_state[TIMINGS_KEY] = {
+        "page": page,
+        "started": time.time(),
+        "sections": [],
+        "charts": [],
+        "deferred": [],
+    }
+
+
+@contextmanager
+def section(name):
+    """Time a block of a page script, usable as ``with`` or as a decorator.
+
+    Records wall time and, with ``APP_TRACE_MEMORY=1``, the peak memory
+    allocated inside the block. The allocation peak is process-wide, so other
+    sessions running at the same time add to it. Sections are expected not to
+    be nested.
+    """
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        mem_start = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = {"section": name, "wall_s": time.perf_counter() - start}
+        if tracing:
+            record["process_alloc_mb"] = (
+                tracemalloc.get_traced_memory()[1] - mem_start
+            ) / 1024**2
+        run = current_run()
+        if run is not None:
+            run["sections"].append(record)
+
+
+def defer(name, render):
+    """Keep the spot for a slow section and draw it after the rest of the page.
+
+    ``render`` is called with no arguments from ``render_deferred`` (which
+    ``render_timings`` calls), once everything below the spot is on screen;
+    until then the spot shows a loading note. Each deferred section is timed
+    as its own section.
+    """
+    run = current_run()
+    if run is None:
+        render()
+        return
+    slot = st.empty()
+    slot.caption(f"Loading {name}...")
+    run["deferred"].append((name, slot, render))
+
+
+def render_deferred():
+    """Fill the spots kept by ``defer``, in page order. Call near the bottom."""
+    run = current_run()
+    if run is None:
+        return
+    if run["deferred"]:
+        # Everything but the deferred sections is on screen by now.
+        run.setdefault("main_s", time.time() - run["started"])
+    while run["deferred"]:
+        name, slot, render = run["deferred"].pop(0)
+        with slot.container(), section(name):
+            render()
+
+
+def budget_kb(env, default):
+    return float(os.environ.get(env, default))
+
+
+def figure_bytes(fig):
+    # Same serialisation st.plotly_chart sends to the browser.
+    return len(pio.to_json(fig, validate=False).encode())
+
+
+def measuring():
+    # Serialising a figure just to count its bytes costs about as much as
+    # sending it, so only do it when somebody reads the numbers.
+    return debug_enabled() or bool(os.environ.get(METRICS_ENV))
+
+
+def plotly_chart(fig, **kwargs):
+    """Drop-in for ``st.plotly_chart`` that records the figure payload size.
+
+    The size is only measured in debug mode or with ``APP_METRICS_FILE`` set.
+    """
+    run = current_run()
+    if run is not None:
+        run.setdefault("first_chart_s", time.time() - run["started"])
+        if measuring():
+            size = figure_bytes(fig)
+            title = fig.layout.title.text or f"chart {len(run['charts'])}"
+            run["charts"].append({"chart": title, "bytes": size})
+            budget = budget_kb(CHART_BUDGET_ENV, CHART_BUDGET_KB)
+            if size > budget * 1024:
+                logger.warning(
+                    "Chart %r is %.0f KB, over the %.0f KB budget",
+                    title,
+                    size / 1024,
+                    budget,
+                )
+    return st.plotly_chart(fig, **kwargs)
+
+
+def current_charts():
+    run = current_run()
+    if run is None:
+        return pd.DataFrame(columns=["chart", "bytes"])
+    return pd.DataFrame(run["charts"], columns=["chart", "bytes"])
+
+
+def current_timings():
+    run = current_run()
+    if run is None:
+        return pd.DataFrame(columns=["section", "wall_s"])
+    return pd.DataFrame(run["sections"])
+
+
+def append_metrics(run, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as f:
+        f.write(json.dumps(run) + "\n")
+
+
+def render_timings():
+    """Show this rerun's timings in the sidebar and append them to the metrics file.
+
+    Call once at the bottom of a page; sections kept with ``defer`` are drawn
+    first. The panel is only drawn when
+    ``APP_DEBUG=1`` or the page is opened with ``?debug=1``; the metrics file
+    is written whenever ``APP_METRICS_FILE`` is set. In either case a page
+    whose charts add up to more than ``APP_PAGE_BUDGET_KB`` is logged as a
+    warning.
+    """
+    run = current_run()
+    if run is None:
+        return
+
+    render_deferred()
+    run["total_s"] = time.time() - run["started"]
+    run["payload_bytes"] = sum(chart["bytes"] for chart in run["charts"])
+    record_rerun(run["page"], run["total_s"])
+
+    page_budget = budget_kb(PAGE_BUDGET_ENV, PAGE_BUDGET_KB)
+    over_budget = run["payload_bytes"] > page_budget * 1024
+    if over_budget:
+        logger.warning(
+            "Page %r sends %.0f KB of charts, over the %.0f KB budget",
+            run["page"],
+            run["payload_bytes"] / 1024,
+            page_budget,
+        )
+
+    metrics_file = os.environ.get(METRICS_ENV)
+    if metrics_file:
+        append_metrics(run, metrics_file)
+
+    if debug_enabled():
+        timings = current_timings()
+        charts = current_charts()
+        chart_budget = budget_kb(CHART_BUDGET_ENV, CHART_BUDGET_KB)
+        with st.sidebar.expander("Timings", expanded=True):
+            st.write(f"Total rerun: {run['total_s']:.3f} s")
+            if "first_chart_s" in run:
+                st.write(f"First chart: {run['first_chart_s']:.3f} s")
+            if "main_s" in run:
+                st.write(f"Before deferred sections: {run['main_s']:.3f} s")
+            st.dataframe(
+                timings,
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    "wall_s": st.column_config.NumberColumn(format="%.3f"),
+                    "process_alloc_mb": st.column_config.NumberColumn(
+                        "process alloc (MB)",
+                        format="%.2f",
+                        help="Peak allocations of the whole server process while the section ran, other sessions included.",
+                    ),
+                },
+            )
+        with st.sidebar.expander("Chart payloads", expanded=True):
+            st.write(
+                f"Total: {run['payload_bytes'] / 1024:.0f} KB"
+                f" (budget {page_budget:.0f} KB)"
+            )
+            if over_budget:
+                st.warning("This page is over its payload budget.")
+            charts["kb"] = charts["bytes"] / 1024
+            charts["over budget"] = charts["kb"] > chart_budget
+            st.dataframe(
+                charts.drop(columns="bytes"),
+                hide_index=True,
+                use_container_width=True,
+                column_config={"kb": st.column_config.NumberColumn(format="%.1f")},
+            )
@@ -0,0 +1,143 @@
+import logging
+import os
+import threading
+import time
+from functools import partial
+
+import streamlit as st
+
+from utils.aggregates import load_aggregates, load_cis, load_deltas
+from utils.artists import load_artist_index
+from utils.data import DECADE_COLS, PAGE_DECADES, load_all, load_decade
+from utils.figures import (
+    load_decade_figures,
+    load_distribution_figure,
+    load_overall_figures,
+    load_sample_distributions,
+    load_sample_figures,
+    load_top_artists,
+)
+from utils.sample import load_sample
+from utils.sketches import load_sketches
+from utils.sql import connection
+from utils.store import preload
+from utils.years import load_yearly_table
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_ENV = "APP_WARM_UP"
+
+_ready = threading.Event()
+_lock = threading.Lock()
+_thread = None
+
+progress = {"done": 0, "total": 0, "step": None, "failed": []}
+
+
+def warm_up_steps():
+    steps = [
+        ("aggregates", load_aggregates),
+        ("deltas", load_deltas),
+        ("confidence intervals", load_cis),
+        ("quantile sketches", load_sketches),
+        ("artist index", load_artist_index),
+        ("sample", load_sample),
+        ("all decades", load_all),
+        ("sql database", connection),
+        ("overall figures", load_overall_figures),
+        ("yearly trends", partial(load_yearly_table, "mean", 1)),
+    ]
+    for decade in PAGE_DECADES:
+        steps += [
+            (f"{decade} data", partial(load_decade, decade)),
+            (f"{decade} sample figures", partial(load_sample_figures, decade)),
+            (
+                f"{decade} sample distributions",
+                partial(load_sample_distributions, decade),
+            ),
+            (f"{decade} summary figures", partial(load_decade_figures, decade)),
+            (f"{decade} top artists", partial(load_top_artists, decade)),
+        ]
+        steps += [
+            (
+                f"{decade} {col} distribution",
+                partial(load_distribution_figure, decade, col),
+            )
+            for col in DECADE_COLS
+        ]
+    return steps
+
+
+def warm_up():
+    """Fill every data, aggregate and figure cache the pages use."""
+    steps = warm_up_steps()
+    progress.update(done=0, total=len(steps), failed=[])
+    start = time.perf_counter()
+    try:
+        # Pull everything persisted by the previous server in one pass, so
+        # the steps below mostly just move it into the in-memory caches.
+        loaded = preload()
+        logger.info(
+            "Loaded %d persisted cache entries in %.2fs",
+            loaded,
+            time.perf_counter() - start,
+        )
+    except Exception:
+        logger.exception("Could not preload the persisted caches")
+    for name, step in steps:
+        progress["step"] = name
+        step_start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            # A broken step should not keep the rest of the app cold.
+            logger.exception("Warm-up step %r failed", name)
+            progress["failed"].append(name)
+        progress["done"] += 1
+        logger.info(
+            "Warm-up %d/%d: %s (%.2fs)",
+            progress["done"],
+            progress["total"],
+            name,
+            time.perf_counter() - step_start,
+        )
+    progress["step"] = None
+    logger.info("Warm-up finished in %.2fs", time.perf_counter() - start)
+    _ready.set()
+
+
+def start_warm_up():
+    """Start the warm-up on a background thread, once per server process.
+
+    Set ``APP_WARM_UP=0`` to disable it (the benchmarks do, so cold runs stay
+    cold).
+    """
+    global _thread
+    if os.environ.get(WARM_UP_ENV) == "0":
+        return None
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(
+                target=warm_up, name="cache-warm-up", daemon=True
+            )
+            _thread.start()
+    return _thread
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def warm_up_notice():
+    """Kick off the warm-up if needed and tell the user while it is running."""
+    if start_warm_up() is not None and not is_ready():
+        st.caption(
+            f"The app has just started and is still preparing its data"
+            f" ({progress['done']}/{progress['total']}), so this page may take"
+            f" a bit longer to load."
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    warm_up()
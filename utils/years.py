@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.data import FEATURE_COLS, data_version, load_all
+from utils.diagnostics import tracked, tracked_build
+from utils.store import persisted
+
+
+def build_year_index(df):
+    """Sort rows by year once and return (sorted_df, years, offsets).
+
+    Rows for ``years[i]`` live in ``sorted_df.iloc[offsets[i]:offsets[i + 1]]``,
+    so every year is a contiguous slice and per-year aggregates can be taken
+    with ``reduceat`` over the offsets instead of a groupby.
+    """
+    order = np.argsort(df["year"].to_numpy(), kind="stable")
+    sorted_df = df.iloc[order].reset_index(drop=True)
+    years, offsets = np.unique(sorted_df["year"].to_numpy(), return_index=True)
+    offsets = np.append(offsets, len(sorted_df))
+    return sorted_df, years, offsets
+
+
+def segment_sums(values, offsets):
+    return np.add.reduceat(values, offsets[:-1], axis=0)
+
+
+def segment_medians(values, offsets):
+    counts = np.diff(offsets)
+    segment = np.repeat(np.arange(len(counts)), counts)
+    lo = offsets[:-1] + (counts - 1) // 2
+    hi = offsets[:-1] + counts // 2
+    out = np.empty((len(counts), values.shape[1]))
+    for j in range(values.shape[1]):
+        # Sorting by (segment, value) keeps each year contiguous, so the
+        # middle elements can be picked straight from the offsets.
+        col = values[np.lexsort((values[:, j], segment)), j]
+        out[:, j] = (col[lo] + col[hi]) / 2
+    return out
+
+
+def yearly_table(sorted_df, years, offsets, cols, stat="mean", window=1):
+    values = sorted_df[cols].to_numpy(dtype=np.float64)
+    counts = pd.Series(np.diff(offsets), index=years)
+
+    if stat == "mean":
+        sums = pd.DataFrame(segment_sums(values, offsets), index=years, columns=cols)
+        # Weight the rolling window by track count so sparse years do not
+        # pull the average as much as full ones.
+        table = (
+            sums.rolling(window, min_periods=1)
+            .sum()
+            .div(counts.rolling(window, min_periods=1).sum(), axis=0)
+        )
+    elif stat == "median":
+        table = pd.DataFrame(
+            segment_medians(values, offsets), index=years, columns=cols
+        )
+        table = table.rolling(window, min_periods=1).median()
+    else:
+        raise ValueError(f"Unknown stat: {stat}")
+
+    table.index.name = "year"
+    table["count"] = counts
+    return table
+
+
+@tracked("year_index")
+def load_year_index():
+    return _load_year_index(data_version())
+
+
+@tracked("yearly_table")
+def load_yearly_table(stat="mean", window=1):
+    return _load_yearly_table(stat, window, data_version())
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+@tracked_build("year_index")
+@persisted("year_index")
+def _load_year_index(version):
+    return build_year_index(load_all())
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+@tracked_build("yearly_table")
+def _load_yearly_table(stat, window, version):
+    sorted_df, years, offsets = load_year_index()
+    return yearly_table(sorted_df, years, offsets, FEATURE_COLS, stat, window)